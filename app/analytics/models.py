@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Float, Integer, Date, Uuid
+from app.core.database import Base
+
+
+#sales per day x product, no FK so history survives product deletion
+class DailyProductSales(Base):
+    __tablename__ = "daily_product_sales"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(Uuid, primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+
+#sales per day x category, "" stands in for uncategorized products
+class DailyCategorySales(Base):
+    __tablename__ = "daily_category_sales"
+
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
@@ -0,0 +1,153 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import Date, func, insert
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.analytics.models import DailyProductSales, DailyCategorySales
+from app.analytics.schemas import SalesGrouping
+from app.orders.models import Order, OrderItem, OrderStatus
+from app.products.models import Product
+
+UNCATEGORIZED = ""
+
+
+#called from checkout inside the order's transaction
+#lines are (product_id, category, quantity, revenue), revenue is the line total net of promotions
+def record_sale(db: Session, day: date, lines: Iterable[Tuple[UUID, Optional[str], int, float]]):
+    by_product = defaultdict(lambda: [0, 0.0])
+    by_category = defaultdict(lambda: [0, 0.0])
+    for product_id, category, quantity, revenue in lines:
+        for bucket in (by_product[product_id], by_category[category or UNCATEGORIZED]):
+            bucket[0] += quantity
+            bucket[1] += revenue
+
+    #sorted so concurrent checkouts lock rollup rows in the same order
+    _increment(db, DailyProductSales, "product_id", day, sorted(by_product.items(), key=lambda kv: str(kv[0])))
+    _increment(db, DailyCategorySales, "category", day, sorted(by_category.items()))
+
+
+def _increment(db: Session, model, key: str, day: date, totals):
+    if not totals:
+        return
+    stmt = dialect_insert(db, model).values([
+        {"day": day, key: value, "units": units, "revenue": revenue}
+        for value, (units, revenue) in totals
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", key],
+        set_={
+            "units": model.units + stmt.excluded.units,
+            "revenue": model.revenue + stmt.excluded.revenue,
+        },
+    )
+    db.execute(stmt)
+
+
+#recomputes [start, end] from the raw order tables, for backfills and drift repair
+def rebuild(db: Session, start: date, end: date) -> Tuple[int, int]:
+    start_at = datetime.combine(start, time.min)
+    end_at = datetime.combine(end + timedelta(days=1), time.min)
+    #date() works on postgres and sqlite, CAST(... AS DATE) is a number on sqlite
+    day = func.date(Order.created_at, type_=Date)
+    category = func.coalesce(Product.category, UNCATEGORIZED)
+
+    sold = (
+        db.query(
+            day.label("day"),
+            OrderItem.product_id,
+            category.label("category"),
+            func.sum(OrderItem.quantity).label("units"),
+            func.sum(OrderItem.quantity * OrderItem.price - OrderItem.discount).label("revenue"),
+        )
+        .join(Order, OrderItem.order_id == Order.id)
+        .outerjoin(Product, OrderItem.product_id == Product.id)
+        .filter(
+            Order.created_at >= start_at,
+            Order.created_at < end_at,
+            Order.status != OrderStatus.cancelled.value,
+        )
+        .group_by(day, OrderItem.product_id, category)
+        .all()
+    )
+
+    by_category = defaultdict(lambda: [0, 0.0])
+    product_rows = []
+    for row in sold:
+        product_rows.append({"day": row.day, "product_id": row.product_id,
+                             "units": int(row.units), "revenue": float(row.revenue)})
+        bucket = by_category[(row.day, row.category)]
+        bucket[0] += int(row.units)
+        bucket[1] += float(row.revenue)
+    category_rows = [{"day": day_, "category": category_, "units": units, "revenue": revenue}
+                     for (day_, category_), (units, revenue) in by_category.items()]
+
+    for model in (DailyProductSales, DailyCategorySales):
+        db.query(model).filter(model.day >= start, model.day <= end).delete(synchronize_session=False)
+    if product_rows:
+        db.execute(insert(DailyProductSales), product_rows)
+    if category_rows:
+        db.execute(insert(DailyCategorySales), category_rows)
+    db.commit()
+    return len(product_rows), len(category_rows)
+
+
+#sums units and revenue per distinct key, keys come back sorted
+def aggregate(keys, units, revenue):
+    labels, inverse = np.unique(np.asarray(keys, dtype=str), return_inverse=True)
+    units_sum = np.bincount(inverse, weights=np.asarray(units, dtype=np.float64), minlength=len(labels))
+    revenue_sum = np.bincount(inverse, weights=np.asarray(revenue, dtype=np.float64), minlength=len(labels))
+    return labels, units_sum, revenue_sum
+
+
+#answered from the rollup tables only, never from orders/order_items
+def sales_report(db: Session, start: date, end: date, group_by: SalesGrouping, top: int) -> dict:
+    if group_by == SalesGrouping.product:
+        model, key = DailyProductSales, DailyProductSales.product_id
+    else:
+        model = DailyCategorySales
+        key = DailyCategorySales.day if group_by == SalesGrouping.day else DailyCategorySales.category
+
+    rows = (
+        db.query(key, model.units, model.revenue)
+        .filter(model.day >= start, model.day <= end)
+        .all()
+    )
+    labels, units, revenue = aggregate(
+        [str(row[0]) for row in rows],
+        [row[1] for row in rows],
+        [row[2] for row in rows],
+    )
+
+    if group_by == SalesGrouping.day:
+        order = np.arange(len(labels))
+    else:
+        order = np.argsort(-revenue, kind="stable")[:top]
+
+    names = {}
+    if group_by == SalesGrouping.product and len(order):
+        top_ids = [UUID(labels[i]) for i in order]
+        names = {str(product_id): name for product_id, name in
+                 db.query(Product.id, Product.name).filter(Product.id.in_(top_ids)).all()}
+
+    buckets = [
+        {
+            "key": str(labels[i]),
+            "label": names.get(str(labels[i])) if group_by == SalesGrouping.product else None,
+            "units": int(units[i]),
+            "revenue": round(float(revenue[i]), 2),
+        }
+        for i in order
+    ]
+    return {
+        "start": start,
+        "end": end,
+        "group_by": group_by,
+        "total_units": int(units.sum()),
+        "total_revenue": round(float(revenue.sum()), 2),
+        "buckets": buckets,
+    }
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from datetime import date
+
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.analytics import rollups, schemas
+from app.orders.archive import archive_cutoff
+from app.auth.dependencies import admin_required
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+router = APIRouter(prefix="/admin/analytics", tags=["admin-analytics"], dependencies=[Depends(admin_required)])
+
+#longest range a single report may cover
+MAX_RANGE_DAYS = 366
+
+
+def _check_range(start: date, end: date):
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days")
+
+
+#revenue and units by day, category or top products
+@router.get("/sales", response_model=schemas.SalesReport)
+def get_sales_report(
+    start: date,
+    end: date,
+    group_by: schemas.SalesGrouping = schemas.SalesGrouping.day,
+    top: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        _check_range(start, end)
+        logger.debug("Sales report: start=%s, end=%s, group_by=%s", start, end, group_by.value)
+        report = rollups.sales_report(db, start, end, group_by, top)
+        logger.info("Sales report returned %d buckets", len(report["buckets"]))
+        return report
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while building sales report: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+#recompute rollups from raw orders, meant for backfills and a nightly compaction job
+@router.post("/rollups/rebuild", response_model=schemas.RollupRebuildResponse)
+def rebuild_rollups(start: date, end: date, db: Session = Depends(get_db)):
+    try:
+        _check_range(start, end)
+        #archived orders are gone from the raw tables, rebuilding would zero those days
+        if settings.ORDER_ARCHIVE_ENABLED and start < archive_cutoff().date():
+            raise HTTPException(status_code=400, detail="Range reaches into archived orders")
+        logger.debug("Rebuilding sales rollups: start=%s, end=%s", start, end)
+        product_rows, category_rows = rollups.rebuild(db, start, end)
+        logger.info("Rebuilt sales rollups: %d product rows, %d category rows", product_rows, category_rows)
+        return {"start": start, "end": end, "product_rows": product_rows, "category_rows": category_rows}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while rebuilding sales rollups: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
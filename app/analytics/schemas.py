@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Optional
+from enum import Enum
+
+
+class SalesGrouping(str, Enum):
+    day = "day"
+    category = "category"
+    product = "product"
+
+
+class SalesBucket(BaseModel):
+    key: str
+    label: Optional[str] = None
+    units: int
+    revenue: float
+
+
+class SalesReport(BaseModel):
+    start: date
+    end: date
+    group_by: SalesGrouping
+    total_units: int
+    total_revenue: float
+    buckets: List[SalesBucket]
+
+
+class RollupRebuildResponse(BaseModel):
+    start: date
+    end: date
+    product_rows: int
+    category_rows: int
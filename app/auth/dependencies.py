@@ -1,3 +1,4 @@
+from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
@@ -6,6 +7,7 @@ from app.core.database import get_db
 from app.core.config import settings
 from app.auth import models as auth_models
 from app.auth.schemas import UserRole
+from app.auth.revocation import is_revoked
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/signin")
 
@@ -13,6 +15,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/signin")
 def get_current_user_role(token: str = Depends(oauth2_scheme)) -> UserRole:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        _check_not_revoked(payload)
         role_str: str = payload.get("role")
         if role_str is None:
             raise HTTPException(
@@ -26,6 +29,14 @@ def get_current_user_role(token: str = Depends(oauth2_scheme)) -> UserRole:
             detail="Invalid authentication credentials",
         )
 
+#logged out tokens, usually just a bloom filter probe
+def _check_not_revoked(payload: dict):
+    if is_revoked(payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+        )
+
 #admin check
 def admin_required(role: UserRole = Depends(get_current_user_role)):
     if role != UserRole.admin:
@@ -49,20 +60,22 @@ def get_current_user(
 ) -> auth_models.User:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        _check_not_revoked(payload)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials: user ID missing",
             )
-        user = db.query(auth_models.User).filter(auth_models.User.id == user_id).first()
+        #parsed here so the comparison works on every database backend
+        user = db.query(auth_models.User).filter(auth_models.User.id == UUID(user_id)).first()
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found",
             )
         return user
-    except JWTError:
+    except (JWTError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
@@ -71,5 +84,5 @@ def get_current_user(
 #returns id of the logged in user
 def get_current_user_id(
     current_user: auth_models.User = Depends(get_current_user)
-) -> str:
-    return str(current_user.id)
+) -> UUID:
+    return current_user.id
@@ -1,6 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Boolean, DateTime, func, Enum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, DateTime, func, Enum, Uuid
 from app.core.database import Base
 from pydantic import field_validator
 import re
@@ -14,8 +13,18 @@ class UserRole(str, enum.Enum):
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     role = Column(Enum(UserRole), default=UserRole.user, nullable=False)  #"admin" or "user" role only
     password = Column(String, nullable=False)  # storing hashed password here
+
+
+#logged out tokens, rows can be purged once the token would have expired anyway
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)
+    user_id = Column(Uuid, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
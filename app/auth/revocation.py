@@ -0,0 +1,172 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.auth.models import RevokedToken
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+#revoked_at comes from now(), i.e. transaction start, so a slow transaction can
+#commit a row older than the watermark; incremental loads re-read this far back
+WATERMARK_OVERLAP_SECONDS = 30
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        #request threads and the refresh thread both add, |= on a shared byte is not atomic
+        self._lock = threading.Lock()
+
+    #double hashing over one blake2b digest
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, key: str):
+        positions = list(self._positions(key))
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        positions = list(self._positions(key))
+        with self._lock:
+            bits = self._bits
+            return all(bits[position >> 3] & (1 << (position & 7)) for position in positions)
+
+
+#per-worker view of revoked_tokens, a miss in the filter means "not revoked" with no
+#query; a hit is confirmed against the primary since it may be a false positive
+class RevocationList:
+    def __init__(self, refresh_interval: float, rebuild_interval: float):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._filter = BloomFilter(settings.REVOCATION_BLOOM_CAPACITY, settings.REVOCATION_BLOOM_ERROR_RATE)
+        self._watermark: Optional[datetime] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        #jtis revoked here while a rebuild runs, replayed into the new filter before the swap
+        self._replay: Optional[List[str]] = None
+        self._thread = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        #tokens issued before jti existed can't be revoked, they just expire
+        if not jti:
+            return False
+        self._ensure_refreshing()
+        if jti not in self._filter:
+            return False
+        db = SessionLocal()
+        try:
+            return db.get(RevokedToken, jti) is not None
+        finally:
+            db.close()
+
+    def revoke(self, db: Session, tokens: Iterable[Tuple[str, datetime, Optional[UUID]]]):
+        rows = [{"jti": jti, "expires_at": expires_at, "user_id": user_id} for jti, expires_at, user_id in tokens]
+        if not rows:
+            return
+        db.execute(dialect_insert(db, RevokedToken).values(rows).on_conflict_do_nothing(index_elements=["jti"]))
+        db.commit()
+        #visible here at once, other workers pick it up on their next refresh
+        with self._lock:
+            for row in rows:
+                self._filter.add(row["jti"])
+                if self._replay is not None:
+                    self._replay.append(row["jti"])
+
+    #full reload, also the only way expired entries leave the filter
+    def rebuild(self, db: Session):
+        with self._lock:
+            self._replay = []
+        try:
+            now = _utcnow()
+            rows = db.query(RevokedToken.jti, RevokedToken.revoked_at).filter(RevokedToken.expires_at > now).all()
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+        bloom = BloomFilter(max(settings.REVOCATION_BLOOM_CAPACITY, 2 * len(rows)), settings.REVOCATION_BLOOM_ERROR_RATE)
+        for row in rows:
+            bloom.add(row.jti)
+        watermark = max((row.revoked_at for row in rows), default=None)
+        with self._lock:
+            #logouts on this worker that the query may not have seen
+            for jti in self._replay:
+                bloom.add(jti)
+            self._replay = None
+            self._filter = bloom
+            self._watermark = watermark
+            self._built_at = time.monotonic()
+        logger.info("Loaded %d revoked tokens into the bloom filter", len(rows))
+
+    #only rows revoked since the last load
+    def refresh(self, db: Session):
+        if self._watermark is None or self._filter.count >= self._filter.capacity:
+            self.rebuild(db)
+            return
+        since = self._watermark - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+        rows = db.query(RevokedToken.jti, RevokedToken.revoked_at).filter(RevokedToken.revoked_at > since).all()
+        for row in rows:
+            self._filter.add(row.jti)
+        if rows:
+            self._watermark = max(self._watermark, max(row.revoked_at for row in rows))
+            logger.debug("Added %d revoked tokens to the bloom filter", len(rows))
+
+    #expired tokens fail signature checks anyway, their rows are just dead weight
+    def purge_expired(self, db: Session) -> int:
+        deleted = db.query(RevokedToken).filter(RevokedToken.expires_at <= _utcnow()).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def _ensure_refreshing(self):
+        if self._thread is None and self.refresh_interval > 0:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="revocation-refresh", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            db = SessionLocal()
+            try:
+                if time.monotonic() - self._built_at >= self.rebuild_interval:
+                    self.purge_expired(db)
+                    self.rebuild(db)
+                else:
+                    self.refresh(db)
+            except Exception as e:
+                logger.warning("Could not refresh revoked tokens: %s", str(e))
+            finally:
+                db.close()
+            time.sleep(self.refresh_interval)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+revocations = RevocationList(settings.REVOCATION_REFRESH_SECONDS, settings.REVOCATION_REBUILD_SECONDS)
+
+
+def is_revoked(jti: Optional[str]) -> bool:
+    return revocations.is_revoked(jti)
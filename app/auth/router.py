@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 from app.core.database import get_db
@@ -12,6 +12,12 @@ import re
 from jose import JWTError
 from app.auth.schemas import Token
 from jose import jwt
+from typing import Optional
+from app.cart import guest
+from app.auth.dependencies import oauth2_scheme
+from app.auth.revocation import revocations
+from datetime import datetime, timezone
+from uuid import UUID
 
 
 from app.core.logger import setup_logger
@@ -47,7 +53,12 @@ def signup(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
 
 @router.post("/signin", response_model=schemas.Token)
 #OAuth2 extracts data from x-www-form thing in postman
-def signin(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def signin(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    #guest cart built before logging in, merged into the user's cart
+    guest_cart: Optional[str] = Header(None, alias="X-Guest-Cart"),
+    db: Session = Depends(get_db)
+):
     try:
         logger.debug("Signin attempt for email: %s", form_data.username)
         user = db.query(models.User).filter(models.User.email == form_data.username).first()
@@ -56,15 +67,65 @@ def signin(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
             logger.warning("Invalid signin attempt for email: %s", form_data.username)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
+        if guest_cart and user.role == schemas.UserRole.user:
+            try:
+                guest.merge_into_user_cart(db, user.id, guest.decode_guest_cart(guest_cart))
+            except HTTPException:
+                #a stale guest cart shouldn't block signing in
+                logger.warning("Ignoring invalid guest cart on signin for: %s", user.email)
+            except Exception as e:
+                #nor should a failed merge, the guest keeps the token and can retry
+                db.rollback()
+                logger.exception("Could not merge guest cart on signin for %s: %s", user.email, str(e))
+
         #token generation
         access_token = utils.create_access_token(data={"sub": str(user.id), "role": user.role})
         refresh_token = utils.create_refresh_token(data={"sub": str(user.id), "role": user.role})
         logger.info("User signed in successfully: %s", user.email)
         return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Signin error: %s", str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
+#revokes the bearer access token and, if given, the matching refresh token
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    body: Optional[schemas.LogoutRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    try:
+        access = _decode_for_logout(token)
+        tokens = [access]
+        if body and body.refresh_token:
+            refresh = _decode_for_logout(body.refresh_token)
+            if refresh["sub"] != access["sub"]:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Refresh token belongs to another user")
+            tokens.append(refresh)
+
+        revocations.revoke(db, [
+            (payload["jti"], datetime.fromtimestamp(payload["exp"], timezone.utc).replace(tzinfo=None), UUID(payload["sub"]))
+            for payload in tokens if payload.get("jti")
+        ])
+        logger.info("User logged out: %s", access["sub"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Logout error: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+def _decode_for_logout(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
+    return payload
+
 @router.post("/forgot-password", status_code=200)
 def forgot_password(request: schemas.ForgotPasswordRequest, db: Session = Depends(get_db)):
     try:
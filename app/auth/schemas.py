@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, field_validator, constr, Field
 from uuid import UUID
+from typing import Optional
 import re
 from enum import Enum
 
@@ -42,6 +43,10 @@ class Token(BaseModel):
     refresh_token: str
     token_type: str = "bearer"
 
+#the refresh token is optional, the bearer access token is always revoked
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class TokenData(BaseModel):
     user_id: str
     role: UserRole
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+from uuid import UUID
+
+from fastapi import HTTPException
+from jose import jwt, JWTError
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.cart.models import CartItem
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.logger import setup_logger
+from app.products.models import Product
+
+logger = setup_logger(__name__)
+
+#guest carts live entirely in a signed token the client sends back as X-Guest-Cart,
+#payload stays small: {"typ": "guest_cart", "items": [[<uuid hex>, qty], ...], "exp": ...}
+TOKEN_TYPE = "guest_cart"
+
+
+def encode_guest_cart(items: Dict[UUID, int]) -> str:
+    expire = datetime.now(timezone.utc) + timedelta(days=settings.GUEST_CART_EXPIRE_DAYS)
+    to_encode = {
+        "typ": TOKEN_TYPE,
+        "items": [[product_id.hex, quantity] for product_id, quantity in items.items()],
+        "exp": expire,
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+#empty cart when there is no token yet, 400 when it's tampered with or expired
+def decode_guest_cart(token: str | None) -> Dict[UUID, int]:
+    if not token:
+        return {}
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        if payload.get("typ") != TOKEN_TYPE:
+            raise ValueError("not a guest cart token")
+        items = {}
+        for product_hex, quantity in payload.get("items", []):
+            if not isinstance(quantity, int) or quantity < 1:
+                raise ValueError("bad quantity")
+            items[UUID(hex=product_hex)] = quantity
+        return items
+    except (JWTError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid or expired guest cart")
+
+
+#folds a guest cart into the user's cart_items with one upsert, unknown or sold out
+#products are dropped; a line already in the cart keeps the larger of the two
+#quantities rather than the sum, so replaying the same token on every signin
+#changes nothing, and the result is capped at current stock
+def merge_into_user_cart(db: Session, user_id: UUID, items: Dict[UUID, int]) -> int:
+    if not items:
+        return 0
+    stock = dict(db.query(Product.id, Product.stock).filter(Product.id.in_(list(items))).all())
+    rows = [
+        {"user_id": user_id, "product_id": product_id, "quantity": min(quantity, stock[product_id])}
+        for product_id, quantity in items.items()
+        if stock.get(product_id, 0) > 0
+    ]
+    if not rows:
+        return 0
+    statement = dialect_insert(db, CartItem).values(rows)
+    stock_now = select(Product.stock).where(Product.id == statement.excluded.product_id).scalar_subquery()
+    greatest, least = _greatest_least(db)
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "product_id"],
+        set_={"quantity": least(greatest(CartItem.quantity, statement.excluded.quantity), stock_now)},
+    )
+    db.execute(statement)
+    db.commit()
+    logger.info("Merged %d guest cart items for user %s", len(rows), user_id)
+    return len(rows)
+
+
+#sqlite's multi-argument min()/max() are its least()/greatest()
+def _greatest_least(db: Session):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.max, func.min
+    return func.greatest, func.least
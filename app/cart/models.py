@@ -1,15 +1,16 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint, Uuid
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 import uuid
-from sqlalchemy.dialects.postgresql import UUID
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    #one row per product per user, guest cart merges upsert on it
+    __table_args__ = (UniqueConstraint("user_id", "product_id", name="uq_cart_items_user_product"),)
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Uuid, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
 
     #all product things can be accessed via cart_items
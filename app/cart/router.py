@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, status
 from sqlalchemy.orm import Session
+from typing import Dict, Optional
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_read_db, record_write, wrote_recently
+from app.cart import guest
 from app.cart.models import CartItem
-from app.cart.schemas import CartItemCreate, CartItemUpdate, CartItemResponse
+from app.cart.schemas import CartItemCreate, CartItemUpdate, CartItemResponse, GuestCartResponse
+from app.products import lookup
+from app.promotions.engine import CartLine, engine as promotion_engine
+from app.promotions.schemas import CartPreview
 from app.auth.models import User                     
 from app.products.models import Product               
 from app.auth.dependencies import get_current_user
@@ -12,7 +18,121 @@ from app.auth.dependencies import user_required
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
-router = APIRouter(prefix="/cart", tags=["Cart"])
+router = APIRouter(prefix="/cart", tags=["Cart"], dependencies=[Depends(record_write)])
+#anonymous carts, the cart travels in the X-Guest-Cart token and nothing is written
+guest_router = APIRouter(prefix="/cart/guest", tags=["Cart"])
+
+
+@guest_router.get("", response_model=GuestCartResponse)
+def view_guest_cart(
+    request: Request,
+    guest_cart: Optional[str] = Header(None, alias="X-Guest-Cart"),
+    db: Session = Depends(get_read_db)
+):
+    try:
+        items = guest.decode_guest_cart(guest_cart)
+        return _guest_cart_response(items, db, wrote_recently(request))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while viewing guest cart: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@guest_router.post("", response_model=GuestCartResponse)
+def add_to_guest_cart(
+    request: Request,
+    item: CartItemCreate,
+    guest_cart: Optional[str] = Header(None, alias="X-Guest-Cart"),
+    db: Session = Depends(get_read_db)
+):
+    try:
+        items = guest.decode_guest_cart(guest_cart)
+        if item.quantity < 1:
+            raise HTTPException(status_code=400, detail="Quantity must be at least 1")
+        if item.product_id not in items and len(items) >= settings.GUEST_CART_MAX_ITEMS:
+            raise HTTPException(status_code=400, detail="Guest cart is full")
+
+        product = lookup.load_products([item.product_id], db, fresh=wrote_recently(request)).get(item.product_id)
+        if not product:
+            logger.warning("Product not found: %s", item.product_id)
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        total_quantity = items.get(item.product_id, 0) + item.quantity
+        if product["stock"] < total_quantity:
+            logger.warning("Insufficient stock for product %s", item.product_id)
+            raise HTTPException(status_code=400, detail="Not enough stock available")
+
+        items[item.product_id] = total_quantity
+        return _guest_cart_response(items, db, wrote_recently(request))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while adding to guest cart: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@guest_router.put("/{product_id}", response_model=GuestCartResponse)
+def update_guest_quantity(
+    request: Request,
+    product_id: UUID,
+    item: CartItemUpdate,
+    guest_cart: Optional[str] = Header(None, alias="X-Guest-Cart"),
+    db: Session = Depends(get_read_db)
+):
+    try:
+        items = guest.decode_guest_cart(guest_cart)
+        if product_id not in items:
+            raise HTTPException(status_code=404, detail="Cart item not found")
+        if item.quantity < 1:
+            raise HTTPException(status_code=400, detail="Quantity must be at least 1")
+
+        product = lookup.load_products([product_id], db, fresh=wrote_recently(request)).get(product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        if item.quantity > items[product_id] and product["stock"] < item.quantity:
+            raise HTTPException(status_code=400, detail="Not enough stock available")
+
+        items[product_id] = item.quantity
+        return _guest_cart_response(items, db, wrote_recently(request))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while updating guest cart: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@guest_router.delete("/{product_id}", response_model=GuestCartResponse)
+def remove_from_guest_cart(
+    request: Request,
+    product_id: UUID,
+    guest_cart: Optional[str] = Header(None, alias="X-Guest-Cart"),
+    db: Session = Depends(get_read_db)
+):
+    try:
+        items = guest.decode_guest_cart(guest_cart)
+        if items.pop(product_id, None) is None:
+            raise HTTPException(status_code=404, detail="Cart item not found")
+        return _guest_cart_response(items, db, wrote_recently(request))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while removing from guest cart: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+#products that disappeared since they were added are dropped from the new token
+def _guest_cart_response(items: Dict[UUID, int], db: Session, fresh: bool = False) -> dict:
+    found = lookup.load_products(list(items), db, fresh) if items else {}
+    items = {product_id: quantity for product_id, quantity in items.items() if product_id in found}
+    return {
+        "token": guest.encode_guest_cart(items),
+        "items": [
+            {"product_id": product_id, "quantity": quantity, "product": found[product_id]}
+            for product_id, quantity in items.items()
+        ],
+    }
+
 
 #add to cart_items
 @router.post("/", response_model=CartItemResponse, dependencies=[Depends(user_required)])
@@ -85,6 +205,27 @@ def view_cart(
         logger.exception("Error while viewing cart: %s", str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
+#what checkout would charge right now, promotions included
+@router.get("/preview", response_model=CartPreview, dependencies=[Depends(user_required)])
+def preview_cart(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        rows = (
+            db.query(CartItem.product_id, CartItem.quantity, Product.category, Product.price)
+            .join(Product, Product.id == CartItem.product_id)
+            .filter(CartItem.user_id == current_user.id)
+            .all()
+        )
+        lines = [CartLine(row.product_id, row.category, row.quantity, row.price) for row in rows]
+        preview = promotion_engine.price_cart(db, lines)
+        logger.info("Cart preview for user %s: %d lines, discount %.2f", current_user.id, len(lines), preview["discount"])
+        return preview
+    except Exception as e:
+        logger.exception("Error while previewing cart: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 #router-> logging and exceptions
 
 #remove item from cart
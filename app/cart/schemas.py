@@ -20,4 +20,9 @@ class CartItemResponse(BaseModel):
     product: ProductResponse 
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+#the token replaces the one the client holds after every guest cart change
+class GuestCartResponse(BaseModel):
+    token: str
+    items: List[CartItemResponse]
@@ -0,0 +1,158 @@
+import asyncio
+from collections import deque
+from typing import Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+#path prefix -> route class, first match wins; anything unmatched is "other"
+ROUTE_CLASSES = [
+    ("/products", "catalog"),
+    ("/media", "catalog"),
+    ("/cart", "cart"),
+    ("/checkout", "checkout"),
+    ("/orders", "checkout"),
+    ("/auth", "auth"),
+    ("/admin", "admin"),
+]
+#never queued: health checks must answer under overload, the feed holds its
+#connection for minutes without a thread, and the profiler is how overload gets debugged
+BYPASS_PATHS = {"/"}
+BYPASS_PREFIXES = ["/health", "/products/feed", "/admin/profile"]
+
+
+def route_class(path: str) -> Optional[str]:
+    if path in BYPASS_PATHS or any(_under(path, prefix) for prefix in BYPASS_PREFIXES):
+        return None
+    for prefix, name in ROUTE_CLASSES:
+        if _under(path, prefix):
+            return name
+    return "other"
+
+
+def _under(path: str, prefix: str) -> bool:
+    return path == prefix or path.startswith(prefix + "/")
+
+
+#concurrency limit with a bounded FIFO wait queue, lives on the worker's event
+#loop so it needs no locks; a released slot is handed straight to the next waiter
+class AdmissionGate:
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.rejected = 0
+        self._waiters = deque()
+
+    async def acquire(self) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            #client went away while queued, give back a slot handed over meanwhile
+            if not self._abandon(waiter):
+                self.release()
+            raise
+        if self._abandon(waiter):
+            self.rejected += 1
+            return False
+        return True
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                #slot passes to the waiter, active stays the same
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    #drops a waiter that gave up, False when a slot was handed over meanwhile
+    def _abandon(self, waiter) -> bool:
+        if waiter.done():
+            return False
+        waiter.cancel()
+        self._waiters.remove(waiter)
+        return True
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "queued": self.queued, "rejected": self.rejected}
+
+
+def build_gates() -> Dict[str, AdmissionGate]:
+    return {
+        name: AdmissionGate(name, limit, settings.ADMISSION_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+        for name, limit in settings.ADMISSION_LIMITS.items()
+    }
+
+
+#startup sanity check, limits above the threadpool just move the pile-up there
+def check_capacity():
+    admitted = sum(settings.ADMISSION_LIMITS.values())
+    if admitted > settings.THREADPOOL_SIZE:
+        logger.warning("Admission limits admit %d requests but THREADPOOL_SIZE is %d",
+                       admitted, settings.THREADPOOL_SIZE)
+    connections = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    if admitted > connections:
+        logger.warning("Admission limits admit %d requests but the DB pool holds %d connections",
+                       admitted, connections)
+
+
+#sheds load before it reaches the threadpool: each route class gets a fixed number
+#of in-flight requests, a short queue, and a fast 503 once that's full or times out
+class AdmissionMiddleware:
+    def __init__(self, app, gates: Optional[Dict[str, AdmissionGate]] = None):
+        self.app = app
+        self.gates = gates if gates is not None else build_gates()
+        self._last_warning: Dict[str, float] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["path"])
+        gate = self.gates.get(name) if name is not None else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await gate.acquire():
+            self._warn(gate)
+            response = JSONResponse(
+                status_code=503,
+                content={"error": True, "message": "Server is busy, try again shortly", "code": 503},
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    #at most one line per class per second, shedding can reject thousands
+    def _warn(self, gate: AdmissionGate):
+        now = asyncio.get_running_loop().time()
+        if now - self._last_warning.get(gate.name, 0.0) >= 1.0:
+            self._last_warning[gate.name] = now
+            logger.warning("Shedding %s requests: %s", gate.name, gate.stats())
@@ -1,17 +1,103 @@
 #this file exposes the .env fields safely to be used in the app
 from pydantic_settings import BaseSettings
-from pydantic import PostgresDsn
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
-    DATABASE_URL: PostgresDsn
+    #any sqlalchemy url, e.g. postgresql://... or sqlite:// (in-memory) for tests
+    DATABASE_URL: str
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7 
-    SMTP_HOST: str
-    SMTP_PORT: int
-    SMTP_USER: str
-    SMTP_PASSWORD: str
+    #only needed for password reset emails, checked when one is sent
+    SMTP_HOST: Optional[str] = None
+    SMTP_PORT: int = 587
+    SMTP_USER: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    #sql logging, very noisy
+    DB_ECHO: bool = False
+    #sized together: threads running sync handlers, and connections they can hold
+    THREADPOOL_SIZE: int = 40
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    #run Base.metadata.create_all at startup
+    DB_CREATE_ALL: bool = True
+    #connections opened (and returned to the pool) before serving traffic
+    DB_WARMUP_CONNECTIONS: int = 5
+    #best sellers loaded into the product cache at startup
+    PRODUCT_CACHE_WARM_COUNT: int = 200
+    #read replicas for read-only endpoints, empty means everything hits the primary
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_HEALTH_CHECK_SECONDS: int = 5
+    #after a write, that client's reads stay on the primary this long (0 disables)
+    READ_YOUR_WRITES_SECONDS: int = 0
+    #background order fulfillment
+    FULFILLMENT_WORKER_ENABLED: bool = False
+    FULFILLMENT_BATCH_SIZE: int = 50
+    FULFILLMENT_POLL_SECONDS: float = 2.0
+    FULFILLMENT_MAX_ATTEMPTS: int = 5
+    FULFILLMENT_LEASE_SECONDS: int = 300
+    #"frequently bought together" index
+    RECOMMENDATIONS_TOP_K: int = 20
+    RECOMMENDATIONS_REBUILD_SECONDS: int = 3600
+    #autocomplete prefix index, rebuilt to pick up other workers' admin writes
+    AUTOCOMPLETE_REBUILD_SECONDS: int = 300
+    #memory-mapped catalog snapshot shared by all workers on a host
+    CATALOG_SNAPSHOT_ENABLED: bool = True
+    CATALOG_SNAPSHOT_DIR: str = "var/catalog"
+    CATALOG_SNAPSHOT_CHECK_SECONDS: float = 1.0
+    #writes within this window are published together, also bounds stock staleness
+    CATALOG_SNAPSHOT_DEBOUNCE_SECONDS: float = 2.0
+    #republished this often regardless of local writes, reads ignore a snapshot past max age
+    CATALOG_SNAPSHOT_REPUBLISH_SECONDS: float = 30.0
+    CATALOG_SNAPSHOT_MAX_AGE_SECONDS: float = 120.0
+    #live stock/price feed over server-sent events, limits are per worker
+    SSE_MAX_CONNECTIONS: int = 1000
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_FLUSH_INTERVAL_SECONDS: float = 0.5
+    #uploaded product images, stored content-addressed on local disk
+    MEDIA_ROOT: str = "var/media"
+    MEDIA_URL_PREFIX: str = "/media"
+    IMAGE_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    IMAGE_VARIANT_WIDTHS: List[int] = [160, 480, 1024]
+    #processes per worker used for resizing
+    IMAGE_WORKERS: int = 2
+    #sampling profiler, requests carrying X-Profile: <token> get profiled (unset disables)
+    PROFILE_HEADER_TOKEN: Optional[str] = None
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+    #per-worker product cache used by batched lookups
+    PRODUCT_CACHE_TTL_SECONDS: int = 30
+    PRODUCT_CACHE_MAX_ENTRIES: int = 10000
+    #anonymous carts kept in a signed client-side token
+    GUEST_CART_EXPIRE_DAYS: int = 30
+    GUEST_CART_MAX_ITEMS: int = 50
+    #how often a worker checks whether promotions changed before reusing its compiled rules
+    PROMOTIONS_CHECK_SECONDS: float = 5.0
+    #old finished orders move to parquet files, the directory must be shared by every host
+    ORDER_ARCHIVE_ENABLED: bool = False
+    ORDER_ARCHIVE_DIR: str = "var/archive/orders"
+    ORDER_ARCHIVE_AFTER_DAYS: int = 365
+    ORDER_ARCHIVE_BATCH_SIZE: int = 1000
+    ORDER_ARCHIVE_INTERVAL_SECONDS: int = 3600
+    ORDER_ARCHIVE_LISTING_SECONDS: int = 60
+    #revoked token bloom filter, other workers see a logout within the refresh interval
+    #(0 turns the background refresh off, only this worker's logouts are seen)
+    REVOCATION_REFRESH_SECONDS: float = 2.0
+    REVOCATION_REBUILD_SECONDS: int = 3600
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    #admission control, in-flight requests per route class (keep the sum <= THREADPOOL_SIZE)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LIMITS: Dict[str, int] = {
+        "catalog": 16, "cart": 6, "checkout": 6, "auth": 4, "admin": 4, "other": 4,
+    }
+    #waiting requests per class beyond the limit, anything more gets a 503 straight away
+    ADMISSION_QUEUE_SIZE: int = 64
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+    #identical concurrent catalog queries share one execution, followers give up waiting after this
+    COALESCE_ENABLED: bool = True
+    COALESCE_WAIT_SECONDS: float = 10.0
 
     class Config:
         env_file = ".env"
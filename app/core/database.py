@@ -1,18 +1,166 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import itertools
+import threading
+import time
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
 from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+#postgres in production, sqlite (file or in-memory) for tests and benchmarks
+def _create_engine(url: str, **kwargs):
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return create_engine(url, pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW, **kwargs)
+
+    options = {"connect_args": {"check_same_thread": False}}
+    if parsed.database in (None, "", ":memory:"):
+        #one shared connection, otherwise every checkout would see an empty database
+        options["poolclass"] = StaticPool
+    sqlite_engine = create_engine(url, **options, **kwargs)
+
+    #pysqlite's own transaction handling breaks SAVEPOINT, let sqlalchemy emit BEGIN
+    @event.listens_for(sqlite_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    @event.listens_for(sqlite_engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return sqlite_engine
+
 
 #creating a connection with the db (echo for logging steps)
-engine = create_engine(str(settings.DATABASE_URL), echo=True)
+#no connection is opened here, warmup.py fills the pool at startup
+engine = _create_engine(settings.DATABASE_URL, echo=settings.DB_ECHO)
 
 #db interactions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+#read-only sessions, on the primary unless bound to a replica per request
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+#INSERT with the dialect's ON CONFLICT support (postgres and sqlite share the api)
+def dialect_insert(db: Session, table):
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
 Base = declarative_base()
 
+#cookie marking a client that wrote recently, value is a unix timestamp
+READ_PRIMARY_COOKIE = "db_primary_until"
+
+
+#round robin over replicas, skipping ones the health checker marked down
+class ReplicaPool:
+    def __init__(self, urls, check_interval: float):
+        self.engines = [_create_engine(url, pool_pre_ping=True) for url in urls]
+        self.check_interval = check_interval
+        self._healthy = [True] * len(self.engines)
+        self._counter = itertools.count()
+        self._checker = None
+        self._lock = threading.Lock()
+
+    def pick(self):
+        if not self.engines:
+            return None
+        self._ensure_checker()
+        start = next(self._counter)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self._healthy[index]:
+                return self.engines[index]
+        return None
+
+    def check_all(self):
+        for index, replica in enumerate(self.engines):
+            try:
+                with replica.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                healthy = True
+            except Exception as e:
+                logger.warning("Replica %s failed health check: %s", replica.url.host, str(e))
+                healthy = False
+            if healthy != self._healthy[index]:
+                logger.info("Replica %s is now %s", replica.url.host, "up" if healthy else "down")
+            self._healthy[index] = healthy
+
+    #health checks run off the request path in a daemon thread
+    def _ensure_checker(self):
+        if self._checker is not None:
+            return
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._run_checker, name="replica-health", daemon=True)
+                self._checker.start()
+
+    def _run_checker(self):
+        while True:
+            self.check_all()
+            time.sleep(self.check_interval)
+
+
+replicas = ReplicaPool(
+    [str(url) for url in settings.DATABASE_REPLICA_URLS],
+    settings.REPLICA_HEALTH_CHECK_SECONDS,
+)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+#read-only session for background jobs, on a replica when one is healthy
+def new_read_session():
+    replica = replicas.pick()
+    return ReadSessionLocal(bind=replica) if replica is not None else ReadSessionLocal()
+
+
+#falls back to the primary when no replica is healthy or the client just wrote
+def get_read_db(request: Request):
+    if wrote_recently(request):
+        db = ReadSessionLocal()
+    else:
+        db = new_read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+#router-level dependency for mutating routes, pins the client to the primary for a while
+def record_write(request: Request, response: Response):
+    window = settings.READ_YOUR_WRITES_SECONDS
+    if window <= 0 or request.method in ("GET", "HEAD", "OPTIONS"):
+        return
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        str(int(time.time()) + window),
+        max_age=window,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+#true while this client's reads are pinned to the primary
+def wrote_recently(request: Request) -> bool:
+    if settings.READ_YOUR_WRITES_SECONDS <= 0:
+        return False
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
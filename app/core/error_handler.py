@@ -12,6 +12,8 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
             "message": exc.detail,
             "code": exc.status_code,
         },
+        #keeps Retry-After / WWW-Authenticate set by the raiser
+        headers=getattr(exc, "headers", None),
     )
 
 #only for validation purposes
@@ -0,0 +1,232 @@
+import functools
+import hmac
+import inspect
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Set
+
+import anyio
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query
+from fastapi.routing import APIRoute
+from fastapi.responses import PlainTextResponse
+
+from app.auth.dependencies import admin_required
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+router = APIRouter(prefix="/admin/profile", tags=["admin-profile"], dependencies=[Depends(admin_required)])
+
+#longest on-demand profile
+MAX_PROFILE_SECONDS = 60
+#header-triggered request profiles running at once, extra requests just aren't profiled
+MAX_ROUTE_PROFILES = 4
+
+#on-demand profiles get their own thread so they don't eat a request thread
+_profile_limiter = anyio.CapacityLimiter(1)
+_profile_lock = threading.Lock()
+
+#route path -> collapsed stack -> samples, filled by ProfilingMiddleware
+_route_profiles: Dict[str, Counter] = {}
+_route_lock = threading.Lock()
+_active_route_profiles = 0
+#threads currently running the endpoint of the profiled request, set by the
+#middleware and copied into the threadpool along with the rest of the context
+_profiled_threads: ContextVar[Optional[Set[int]]] = ContextVar("profiled_threads", default=None)
+
+
+#statistical sampler over sys._current_frames(), output is in the collapsed
+#"frame;frame;frame count" format flamegraph.pl and speedscope read
+class StackSampler:
+    def __init__(self, interval: float, keep: Optional[Callable] = None):
+        self.interval = interval
+        self.keep = keep
+        self.stacks = Counter()
+        self.samples = 0
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (self.keep is not None and not self.keep(thread_id, frame)):
+                continue
+            self.stacks[_collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+        self.samples += 1
+
+    def run_for(self, seconds: float) -> Counter:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self.sample()
+            time.sleep(self.interval)
+        return self.stacks
+
+    def run_until(self, done: threading.Event) -> Counter:
+        while not done.wait(self.interval):
+            self.sample()
+        return self.stacks
+
+
+def _collapse(thread_name: str, frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        frames.append(f"{module}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    frames.append(thread_name)
+    return ";".join(reversed(frames))
+
+
+def format_collapsed(stacks: Counter) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+#samples every thread of this worker for a while
+@router.get("", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(None, ge=1, le=1000),
+):
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        interval = (interval_ms or settings.PROFILE_SAMPLE_INTERVAL_MS) / 1000
+        logger.info("Profiling worker for %.1fs at %.1fms", seconds, interval * 1000)
+        sampler = StackSampler(interval)
+        stacks = await anyio.to_thread.run_sync(sampler.run_for, seconds, limiter=_profile_limiter)
+        logger.info("Profile finished: %d samples, %d distinct stacks", sampler.samples, len(stacks))
+        return format_collapsed(stacks)
+    finally:
+        _profile_lock.release()
+
+
+#routes with header-triggered samples and their sample counts
+@router.get("/routes")
+def list_route_profiles():
+    with _route_lock:
+        return {route: sum(stacks.values()) for route, stacks in _route_profiles.items()}
+
+
+@router.get("/routes/collapsed", response_class=PlainTextResponse)
+def get_route_profile(route: str):
+    with _route_lock:
+        stacks = _route_profiles.get(route)
+        if stacks is None:
+            raise HTTPException(status_code=404, detail="No samples for this route")
+        return format_collapsed(stacks)
+
+
+@router.delete("/routes", status_code=204)
+def reset_route_profiles():
+    with _route_lock:
+        _route_profiles.clear()
+
+
+#profiles a single request when it carries the configured X-Profile token,
+#only the thread running this request's endpoint is sampled (see instrument_routes)
+class ProfilingMiddleware:
+    header = b"x-profile"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILE_HEADER_TOKEN or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        global _active_route_profiles
+        with _route_lock:
+            if _active_route_profiles >= MAX_ROUTE_PROFILES:
+                admitted = False
+            else:
+                _active_route_profiles += 1
+                admitted = True
+        if not admitted:
+            await self.app(scope, receive, send)
+            return
+
+        done = threading.Event()
+        threads: Set[int] = set()
+        token = _profiled_threads.set(threads)
+        #the router fills in scope["endpoint"] once it has matched; async endpoints
+        #share the loop thread, the endpoint check keeps other routes out of those
+        sampler = StackSampler(
+            settings.PROFILE_SAMPLE_INTERVAL_MS / 1000,
+            keep=lambda thread_id, frame: thread_id in threads and _runs_endpoint(scope, frame),
+        )
+        thread = threading.Thread(target=sampler.run_until, args=(done,), name="route-profiler", daemon=True)
+        thread.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _profiled_threads.reset(token)
+            done.set()
+            await anyio.to_thread.run_sync(thread.join)
+            route = scope.get("route")
+            path = getattr(route, "path", scope["path"])
+            with _route_lock:
+                _active_route_profiles -= 1
+                _route_profiles.setdefault(path, Counter()).update(sampler.stacks)
+            logger.debug("Profiled %s: %d samples", path, sampler.samples)
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return hmac.compare_digest(value, settings.PROFILE_HEADER_TOKEN.encode())
+        return False
+
+
+def _runs_endpoint(scope, frame) -> bool:
+    endpoint = scope.get("endpoint")
+    code = getattr(endpoint, "__code__", None)
+    if code is None:
+        return False
+    while frame is not None:
+        if frame.f_code is code:
+            return True
+        frame = frame.f_back
+    return False
+
+
+#wraps every endpoint so a profiled request records which thread runs it;
+#fastapi looks dependant.call up per request, so this is called once routes exist
+def instrument_routes(app: FastAPI):
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not getattr(route.dependant.call, "_profiled", False):
+            route.dependant.call = _tracked(route.dependant.call)
+
+
+def _tracked(call: Callable) -> Callable:
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def run_async(*args, **kwargs):
+            with _registered():
+                return await call(*args, **kwargs)
+        run_async._profiled = True
+        return run_async
+
+    @functools.wraps(call)
+    def run(*args, **kwargs):
+        with _registered():
+            return call(*args, **kwargs)
+    run._profiled = True
+    return run
+
+
+@contextmanager
+def _registered():
+    threads = _profiled_threads.get()
+    if threads is None:
+        yield
+        return
+    ident = threading.get_ident()
+    threads.add(ident)
+    try:
+        yield
+    finally:
+        threads.discard(ident)
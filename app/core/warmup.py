@@ -0,0 +1,106 @@
+import importlib
+import time
+
+from sqlalchemy import func, text
+
+from app.core.config import settings
+from app.core.database import Base, engine, replicas, new_read_session
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+#imported up front so the first request doesn't pay for them
+HEAVY_MODULES = ["numpy", "scipy.sparse", "pyarrow", "PIL.Image"]
+
+
+#runs once per worker before it reports ready, blocking is fine here
+def run():
+    started = time.monotonic()
+    if settings.DB_CREATE_ALL:
+        Base.metadata.create_all(bind=engine)
+    warm_connection_pools()
+    import_heavy_modules()
+    prime_caches()
+    logger.info("Warmup finished in %.2fs", time.monotonic() - started)
+
+
+def warm_connection_pools():
+    _fill_pool(engine, settings.DB_WARMUP_CONNECTIONS)
+    if replicas.engines:
+        replicas.check_all()
+        for replica in replicas.engines:
+            try:
+                _fill_pool(replica, settings.DB_WARMUP_CONNECTIONS)
+            except Exception as e:
+                #the health checker keeps it out of rotation
+                logger.warning("Could not warm replica %s: %s", replica.url.host, str(e))
+
+
+#holding n connections at once forces the pool to actually open n of them,
+#DB_WARMUP_CONNECTIONS=0 skips it
+def _fill_pool(target, count: int):
+    connections = []
+    try:
+        for _ in range(count):
+            conn = target.connect()
+            conn.execute(text("SELECT 1"))
+            connections.append(conn)
+    finally:
+        for conn in connections:
+            conn.close()
+
+
+def import_heavy_modules():
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    #passlib resolves the bcrypt backend lazily on first use
+    from app.auth.utils import pwd_context
+    pwd_context.hash("warmup")
+
+
+#a failed cache never blocks startup, each cache also builds itself on first use
+def prime_caches():
+    from app.auth.revocation import revocations
+    from app.orders.models import OrderItem
+    from app.products import autocomplete, cache, recommendations, snapshot
+    from app.products.models import Product
+    from app.promotions.engine import engine as promotion_engine
+
+    #the first worker up on a host publishes, the rest just map it; same age
+    #limit as the read path, so a snapshot mapped here is one reads will use
+    if settings.CATALOG_SNAPSHOT_ENABLED:
+        try:
+            snapshot.publisher.publish_if_stale(settings.CATALOG_SNAPSHOT_MAX_AGE_SECONDS)
+            snapshot.publisher.start()
+            snapshot.reader.current()
+        except Exception as e:
+            logger.warning("Could not prime catalog snapshot: %s", str(e))
+
+    steps = [
+        ("autocomplete index", lambda db: autocomplete.index.build(db)),
+        ("co-purchase index", lambda db: recommendations.index.build(db)),
+        ("promotion rules", lambda db: promotion_engine.refresh(db)),
+        ("revoked tokens", lambda db: revocations.rebuild(db)),
+    ]
+    if settings.PRODUCT_CACHE_WARM_COUNT > 0:
+        def best_sellers(db):
+            sold = (
+                db.query(OrderItem.product_id, func.sum(OrderItem.quantity).label("units"))
+                .group_by(OrderItem.product_id)
+                .order_by(func.sum(OrderItem.quantity).desc())
+                .limit(settings.PRODUCT_CACHE_WARM_COUNT)
+                .subquery()
+            )
+            products = db.query(Product).join(sold, Product.id == sold.c.product_id).all()
+            cache.set_many(products)
+
+        steps.append(("product cache", best_sellers))
+
+    for name, step in steps:
+        db = new_read_session()
+        try:
+            step(db)
+        except Exception as e:
+            logger.warning("Could not prime %s: %s", name, str(e))
+        finally:
+            db.close()
@@ -1,33 +1,93 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import anyio
+from fastapi import FastAPI, Response, status
+from fastapi.concurrency import run_in_threadpool
 from app.auth.router import router as auth_router
 from app.products.admin_router import router as admin_products_router
-from app.core.database import Base, engine
 from app.products.public_products import router as public_product_router
-from app.cart.router import router as cart_router
+from app.cart.router import router as cart_router, guest_router as guest_cart_router
 from app.orders.checkout import router as checkout_router
 from app.orders.router import router as orders_router
+from app.analytics.router import router as analytics_router
+from app.promotions.router import router as promotions_router
+from app.products.media import router as media_router
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.core.error_handler import http_exception_handler, validation_exception_handler
+from app.core.config import settings
+from app.core import warmup, admission
+from app.core.profiler import router as profiler_router, ProfilingMiddleware, instrument_routes
+from app.orders.fulfillment import worker as fulfillment_worker
+from app.orders.archive import archiver as order_archiver
+from app.products import images
 
 
-Base.metadata.create_all(bind=engine)
+#warmup runs before the worker accepts traffic, readiness flips only after it
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    #threads for sync handlers, sized with the DB pool and admission limits
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    admission.check_capacity()
+    await run_in_threadpool(warmup.run)
+    if settings.FULFILLMENT_WORKER_ENABLED:
+        fulfillment_worker.start()
+    if settings.ORDER_ARCHIVE_ENABLED:
+        order_archiver.start()
+    app.state.ready = True
+    yield
+    #stop advertising readiness first so the load balancer drains us
+    app.state.ready = False
+    await run_in_threadpool(fulfillment_worker.stop)
+    await run_in_threadpool(order_archiver.stop)
+    images.shutdown()
 
 
-app = FastAPI()
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+    app.state.ready = False
 
-app.include_router(auth_router)
-app.include_router(admin_products_router)
-app.include_router(public_product_router)
-app.include_router(cart_router)
-app.include_router(checkout_router)
-app.include_router(orders_router)
+    app.include_router(auth_router)
+    app.include_router(admin_products_router)
+    app.include_router(public_product_router)
+    app.include_router(guest_cart_router)
+    app.include_router(cart_router)
+    app.include_router(checkout_router)
+    app.include_router(orders_router)
+    app.include_router(analytics_router)
+    app.include_router(promotions_router)
+    app.include_router(media_router)
+    app.include_router(profiler_router)
 
+    app.add_middleware(ProfilingMiddleware)
+    #outermost, shed requests shouldn't cost anything further down
+    app.add_middleware(admission.AdmissionMiddleware)
 
-app.add_exception_handler(StarletteHTTPException, http_exception_handler)
-app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
 
-#boiler-plate
-@app.get("/")
-def read_root():
-    return {"message": "Hello World"}
+    #boiler-plate
+    @app.get("/")
+    def read_root():
+        return {"message": "Hello World"}
+
+    #liveness, the process is up
+    @app.get("/health/live")
+    def liveness():
+        return {"status": "ok"}
+
+    #readiness, warmup done and not shutting down
+    @app.get("/health/ready")
+    def readiness(response: Response):
+        if not app.state.ready:
+            response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            return {"status": "unavailable"}
+        return {"status": "ready"}
+
+    #after every route is registered
+    instrument_routes(app)
+    return app
+
+
+#kept for `uvicorn app.main:app`, `uvicorn --factory app.main:create_app` also works
+app = create_app()
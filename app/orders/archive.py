@@ -0,0 +1,236 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.core.logger import setup_logger
+from app.orders.models import ArchivedOrderDay, Order, OrderItem, OrderStatus
+
+logger = setup_logger(__name__)
+
+#orders that can't change any more, anything else stays in postgres
+ARCHIVABLE_STATUSES = [OrderStatus.completed.value, OrderStatus.failed.value, OrderStatus.cancelled.value]
+
+#one row per order with its items nested, files live under date=YYYY-MM-DD/
+#directories (hive style) named after the order's created_at day
+ITEM_TYPE = pa.struct([
+    ("id", pa.binary(16)),
+    ("product_id", pa.binary(16)),
+    ("quantity", pa.int64()),
+    ("price", pa.float64()),
+    ("discount", pa.float64()),
+])
+SCHEMA = pa.schema([
+    ("id", pa.binary(16)),
+    ("user_id", pa.binary(16)),
+    ("created_at", pa.timestamp("us")),
+    ("total_amount", pa.float64()),
+    ("discount_amount", pa.float64()),
+    ("status", pa.string()),
+    ("items", pa.list_(ITEM_TYPE)),
+])
+#small row groups keep user_id min/max statistics selective
+ROW_GROUP_SIZE = 10000
+
+
+def archive_cutoff() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+
+
+#moves one batch from postgres to parquet, returns how many orders moved
+#files are written and fsynced before the delete commits, a crash in between
+#leaves duplicates in the archive which readers drop by order id
+def archive_batch(db: Session, directory: str, cutoff: datetime, batch_size: int) -> int:
+    orders = (
+        db.query(Order)
+        .options(selectinload(Order.items))
+        .filter(Order.status.in_(ARCHIVABLE_STATUSES), Order.created_at < cutoff)
+        .order_by(Order.created_at)
+        .limit(batch_size)
+        .with_for_update(of=Order, skip_locked=True)
+        .all()
+    )
+    if not orders:
+        db.rollback()
+        return 0
+
+    by_day: Dict[date, List[Order]] = defaultdict(list)
+    for order in orders:
+        by_day[order.created_at.date()].append(order)
+    for day, day_orders in by_day.items():
+        _write_partition(directory, day, day_orders)
+
+    markers = {(order.user_id, order.created_at.date()) for order in orders}
+    db.execute(
+        dialect_insert(db, ArchivedOrderDay)
+        .values([{"user_id": user_id, "day": day} for user_id, day in markers])
+        .on_conflict_do_nothing(index_elements=["user_id", "day"])
+    )
+    order_ids = [order.id for order in orders]
+    db.query(OrderItem).filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
+    db.query(Order).filter(Order.id.in_(order_ids)).delete(synchronize_session=False)
+    db.commit()
+    logger.info("Archived %d orders across %d days", len(orders), len(by_day))
+    return len(orders)
+
+
+def _write_partition(directory: str, day: date, orders: List[Order]):
+    #sorted by user so a user's orders sit in as few row groups as possible
+    orders = sorted(orders, key=lambda order: order.user_id.bytes)
+    table = pa.table({
+        "id": [order.id.bytes for order in orders],
+        "user_id": [order.user_id.bytes for order in orders],
+        "created_at": [order.created_at for order in orders],
+        "total_amount": [order.total_amount for order in orders],
+        "discount_amount": [order.discount_amount or 0.0 for order in orders],
+        "status": [order.status for order in orders],
+        "items": [
+            [{"id": item.id.bytes, "product_id": item.product_id.bytes,
+              "quantity": item.quantity, "price": item.price, "discount": item.discount or 0.0}
+             for item in order.items]
+            for order in orders
+        ],
+    }, schema=SCHEMA)
+
+    partition = os.path.join(directory, f"date={day.isoformat()}")
+    os.makedirs(partition, exist_ok=True)
+    name = f"part-{time.time_ns()}-{os.getpid()}.parquet"
+    path = os.path.join(partition, name)
+    #dot-prefixed so readers skip it until it's complete
+    tmp = os.path.join(partition, f".{name}.tmp")
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE)
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    #this worker sees its own batches at once, others on their next listing
+    with _listing_lock:
+        _listings.pop(partition, None)
+
+
+#read side, only touched when the hot tables don't have what was asked for and
+#only for the partitions archived_order_days lists for the user; a partition's
+#file list is kept for ORDER_ARCHIVE_LISTING_SECONDS
+_listings: Dict[str, Tuple[float, List[str]]] = {}
+_listing_lock = threading.Lock()
+
+
+def _partition_files(directory: str, day: date) -> List[str]:
+    partition = os.path.join(directory, f"date={day.isoformat()}")
+    now = time.monotonic()
+    with _listing_lock:
+        cached = _listings.get(partition)
+    if cached is not None and now - cached[0] < settings.ORDER_ARCHIVE_LISTING_SECONDS:
+        return cached[1]
+    try:
+        #dot-prefixed files are still being written
+        files = [os.path.join(partition, name) for name in sorted(os.listdir(partition))
+                 if name.endswith(".parquet") and not name.startswith((".", "_"))]
+    except FileNotFoundError:
+        files = []
+    with _listing_lock:
+        _listings[partition] = (now, files)
+    return files
+
+
+def _archived_days(db: Session, user_id: UUID) -> List[date]:
+    return [row.day for row in db.query(ArchivedOrderDay.day).filter(ArchivedOrderDay.user_id == user_id)]
+
+
+def _rows(directory: str, days: List[date], expression) -> List[dict]:
+    files = [path for day in days for path in _partition_files(directory, day)]
+    if not files:
+        return []
+    rows = ds.dataset(files, format="parquet", schema=SCHEMA).to_table(filter=expression).to_pylist()
+    unique = {}
+    for row in rows:
+        row["id"] = UUID(bytes=row["id"])
+        row["user_id"] = UUID(bytes=row["user_id"])
+        for item in row["items"]:
+            item["id"] = UUID(bytes=item["id"])
+            item["product_id"] = UUID(bytes=item["product_id"])
+            #files written before discounts were archived
+            item["discount"] = item.get("discount") or 0.0
+        unique[row["id"]] = row
+    return list(unique.values())
+
+
+#ids are coerced since callers may hand over the string form
+def orders_for_user(db: Session, user_id: UUID, directory: Optional[str] = None) -> List[dict]:
+    user_id = UUID(str(user_id))
+    days = _archived_days(db, user_id)
+    if not days:
+        return []
+    rows = _rows(directory or settings.ORDER_ARCHIVE_DIR, days, pc.field("user_id") == user_id.bytes)
+    return sorted(rows, key=lambda row: row["created_at"], reverse=True)
+
+
+def get_order(db: Session, order_id: UUID, user_id: UUID, directory: Optional[str] = None) -> Optional[dict]:
+    order_id, user_id = UUID(str(order_id)), UUID(str(user_id))
+    days = _archived_days(db, user_id)
+    if not days:
+        return None
+    rows = _rows(directory or settings.ORDER_ARCHIVE_DIR, days,
+                 (pc.field("id") == order_id.bytes) & (pc.field("user_id") == user_id.bytes))
+    return rows[0] if rows else None
+
+
+#periodic archiving in a daemon thread, batches are claimed with SKIP LOCKED
+#so several workers can run it at once
+class OrderArchiver:
+    def __init__(self):
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="order-archiver", daemon=True)
+        self._thread.start()
+        logger.info("Order archiver started")
+
+    def stop(self, timeout: float = 30):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Order archiver stopped")
+
+    def run_once(self) -> int:
+        cutoff = archive_cutoff()
+        moved = 0
+        while not self._stopping.is_set():
+            db = SessionLocal()
+            try:
+                archived = archive_batch(db, settings.ORDER_ARCHIVE_DIR, cutoff, settings.ORDER_ARCHIVE_BATCH_SIZE)
+            finally:
+                db.close()
+            moved += archived
+            if archived < settings.ORDER_ARCHIVE_BATCH_SIZE:
+                break
+        return moved
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                moved = self.run_once()
+                if moved:
+                    logger.info("Archive run moved %d orders", moved)
+            except Exception as e:
+                logger.exception("Order archiver error: %s", str(e))
+            self._stopping.wait(settings.ORDER_ARCHIVE_INTERVAL_SECONDS)
+
+
+archiver = OrderArchiver()
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from uuid import UUID
-from app.core.database import get_db
+from app.core.database import get_db, record_write
 from app.auth.dependencies import get_current_user_id
 from app.cart.models import CartItem
 from app.orders.models import Order, OrderItem
 from app.products.models import Product
+from app.products import cache, recommendations, autocomplete, snapshot, feed
+from app.orders.fulfillment import worker as fulfillment_worker
+from app.analytics import rollups
+from app.promotions.engine import CartLine, engine as promotion_engine
 
-router = APIRouter(prefix="/checkout", tags=["Checkout"])
+router = APIRouter(prefix="/checkout", tags=["Checkout"], dependencies=[Depends(record_write)])
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def checkout(user_id: UUID = Depends(get_current_user_id), db: Session = Depends(get_db)):
@@ -16,10 +20,14 @@ def checkout(user_id: UUID = Depends(get_current_user_id), db: Session = Depends
     if not cart_items:
         raise HTTPException(status_code=400, detail="Cart is empty")
 
+    #one query for every product in the cart
+    product_ids = [item.product_id for item in cart_items]
+    products = {product.id: product for product in db.query(Product).filter(Product.id.in_(product_ids)).all()}
+
     #calculating the stock
-    total_amount = 0
+    lines = []
     for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        product = products.get(item.product_id)
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
 
@@ -29,16 +37,22 @@ def checkout(user_id: UUID = Depends(get_current_user_id), db: Session = Depends
                 detail=f"Insufficient stock for product '{product.name}'"
             )
 
-        total_amount += item.quantity * product.price
+        lines.append(CartLine(item.product_id, product.category, item.quantity, product.price))
+
+    #promotions are evaluated against the whole cart at once
+    pricing = promotion_engine.price_cart(db, lines)
+    total_amount = pricing["total"]
 
     #order creation
-    order = Order(user_id=user_id, total_amount=total_amount)
+    order = Order(user_id=user_id, total_amount=total_amount, discount_amount=pricing["discount"])
     db.add(order)
     db.flush()  # ensures order.id is available
 
     #dealing with order items table, creating stock
-    for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+    sale_lines = []
+    stock_changes = {}
+    for item, priced in zip(cart_items, pricing["lines"]):
+        product = products[item.product_id]
 
         #stock deduction
         product.stock -= item.quantity
@@ -48,8 +62,17 @@ def checkout(user_id: UUID = Depends(get_current_user_id), db: Session = Depends
             product_id=item.product_id,
             quantity=item.quantity,
             price=product.price,
+            discount=priced["discount"],
         )
         db.add(order_item)
+        #revenue is net of the line's promotion, same as total_amount
+        sale_lines.append((item.product_id, product.category, item.quantity, priced["total"]))
+        stock_changes[item.product_id] = {"stock": product.stock}
+
+    #sales rollups move in the same transaction as the order
+    rollups.record_sale(db, order.created_at.date(), sale_lines)
+
+    purchased = [(item.product_id, item.quantity) for item in cart_items]
 
     #clearing the cart
     db.query(CartItem).filter(CartItem.user_id == user_id).delete()
@@ -57,8 +80,18 @@ def checkout(user_id: UUID = Depends(get_current_user_id), db: Session = Depends
 
     db.commit()
 
+    #stock changed for every purchased product
+    cache.invalidate(product_ids)
+    snapshot.request_publish()
+    feed.publish(stock_changes)
+    recommendations.index.record_order(product_ids)
+    autocomplete.index.record_sales(purchased)
+    #post-purchase work happens in the fulfillment worker, not here
+    fulfillment_worker.notify()
+
     return {
         "message": "Order placed successfully",
         "order_id": order.id,
+        "discount": pricing["discount"],
         "total": total_amount
     }
@@ -0,0 +1,157 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logger import setup_logger
+from app.orders.models import Order, OrderStatus
+
+logger = setup_logger(__name__)
+
+#allowed status moves, anything else is a bug in the caller
+TRANSITIONS = {
+    OrderStatus.pending: {OrderStatus.processing, OrderStatus.cancelled},
+    OrderStatus.processing: {OrderStatus.pending, OrderStatus.completed, OrderStatus.failed},
+    OrderStatus.completed: set(),
+    OrderStatus.failed: {OrderStatus.pending},  #manual requeue out of the dead letter
+    OrderStatus.cancelled: set(),
+}
+
+#longest wait between retries
+MAX_BACKOFF_SECONDS = 3600
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def transition(order: Order, new_status: OrderStatus):
+    current = OrderStatus(order.status)
+    if new_status not in TRANSITIONS[current]:
+        raise InvalidTransition(f"Order {order.id} cannot go from {current.value} to {new_status.value}")
+    order.status = new_status.value
+
+
+#post-purchase work (emails, payment capture, warehouse handoff) registers here
+#steps run in order and must be idempotent, a retry reruns all of them
+_steps: List[Tuple[str, Callable[[Session, Order], None]]] = []
+
+
+def register_step(name: str, func: Callable[[Session, Order], None]):
+    _steps.append((name, func))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+#claims due orders, expired leases count as due so crashed workers don't strand orders
+def claim_batch(db: Session, batch_size: int) -> List[Order]:
+    now = _utcnow()
+    due = or_(Order.next_attempt_at.is_(None), Order.next_attempt_at <= now)
+    orders = (
+        db.query(Order)
+        .filter(Order.status.in_([OrderStatus.pending.value, OrderStatus.processing.value]), due)
+        .order_by(Order.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    lease_until = now + timedelta(seconds=settings.FULFILLMENT_LEASE_SECONDS)
+    for order in orders:
+        if order.status == OrderStatus.pending.value:
+            transition(order, OrderStatus.processing)
+        order.attempts += 1
+        order.next_attempt_at = lease_until
+    db.commit()
+    return orders
+
+
+def process_order(db: Session, order: Order):
+    try:
+        for name, func in _steps:
+            logger.debug("Running fulfillment step %s for order %s", name, order.id)
+            func(db, order)
+        transition(order, OrderStatus.completed)
+        order.next_attempt_at = None
+        order.last_error = None
+        db.commit()
+        logger.info("Order %s fulfilled", order.id)
+    except Exception as e:
+        db.rollback()
+        _record_failure(db, order, e)
+
+
+def _record_failure(db: Session, order: Order, error: Exception):
+    order = db.get(Order, order.id)
+    order.last_error = str(error)[:500]
+    if order.attempts >= settings.FULFILLMENT_MAX_ATTEMPTS:
+        transition(order, OrderStatus.failed)
+        order.next_attempt_at = None
+        logger.error("Order %s dead-lettered after %d attempts: %s", order.id, order.attempts, str(error))
+    else:
+        transition(order, OrderStatus.pending)
+        backoff = min(2 ** order.attempts * settings.FULFILLMENT_POLL_SECONDS, MAX_BACKOFF_SECONDS)
+        order.next_attempt_at = _utcnow() + timedelta(seconds=backoff)
+        logger.warning("Order %s failed attempt %d, retrying in %ds: %s",
+                       order.id, order.attempts, backoff, str(error))
+    db.commit()
+
+
+#polls for due orders in a daemon thread, notify() skips the wait after a checkout
+class FulfillmentWorker:
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="order-fulfillment", daemon=True)
+        self._thread.start()
+        logger.info("Fulfillment worker started")
+
+    def stop(self, timeout: float = 10):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Fulfillment worker stopped")
+
+    def notify(self):
+        self._wakeup.set()
+
+    def run_once(self) -> int:
+        db = SessionLocal()
+        try:
+            orders = claim_batch(db, settings.FULFILLMENT_BATCH_SIZE)
+            for order in orders:
+                if self._stopping.is_set():
+                    break  #unprocessed orders come back once their lease expires
+                process_order(db, order)
+            return len(orders)
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception as e:
+                logger.exception("Fulfillment worker error: %s", str(e))
+                claimed = 0
+            #a full batch means there is probably more waiting
+            if claimed < settings.FULFILLMENT_BATCH_SIZE:
+                self._wakeup.wait(settings.FULFILLMENT_POLL_SECONDS)
+                self._wakeup.clear()
+
+
+worker = FulfillmentWorker()
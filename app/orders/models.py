@@ -1,20 +1,35 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Float, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Date, ForeignKey, Integer, String, Float, DateTime, Uuid
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 import uuid
+import enum
 from datetime import datetime, timezone
 
 
+#lifecycle of an order, transitions live in fulfillment.py
+class OrderStatus(str, enum.Enum):
+    pending = "pending"
+    processing = "processing"
+    completed = "completed"
+    failed = "failed"  #dead-lettered after too many attempts
+    cancelled = "cancelled"
+
+
 #used for one particular order
 class Order(Base):
     __tablename__ = "orders"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     total_amount = Column(Float, nullable=False)
-    status = Column(String, default="processing")
+    #promotions applied at checkout, total_amount is already net of it
+    discount_amount = Column(Float, default=0, nullable=False)
+    status = Column(String, default=OrderStatus.pending.value, nullable=False, index=True)
+    #fulfillment bookkeeping, next_attempt_at doubles as the lease while processing
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
 
     items = relationship("OrderItem", back_populates="order", cascade="all, delete")
 
@@ -23,11 +38,22 @@ class Order(Base):
 class OrderItem(Base):
     __tablename__ = "order_items"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
-    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    order_id = Column(Uuid, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Uuid, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
+    #promotion discount on the whole line, revenue is quantity * price - discount
+    discount = Column(Float, default=0, nullable=False)
 
     order = relationship("Order", back_populates="items")
     product = relationship("Product")
+
+
+#which days hold archived orders for a user, written with the archive delete so
+#archive reads open only those partitions and skip users with nothing archived
+class ArchivedOrderDay(Base):
+    __tablename__ = "archived_order_days"
+
+    user_id = Column(Uuid, primary_key=True)
+    day = Column(Date, primary_key=True)
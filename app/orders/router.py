@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from uuid import UUID
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.auth.dependencies import get_current_user_id
-from app.orders import schemas
+from app.orders import schemas, archive
 from app.orders.models import Order
+from app.core.config import settings
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -13,7 +14,7 @@ router = APIRouter(prefix="/orders", tags=["Orders"])
 
 @router.get("/", response_model=list[schemas.OrderSummaryResponse])
 def get_order_history(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user_id: UUID = Depends(get_current_user_id)
 ):
     try:
@@ -24,8 +25,10 @@ def get_order_history(
             .order_by(Order.created_at.desc())
             .all()
         )
-        logger.info("Fetched %d orders for user: %s", len(orders), user_id)
-        return orders
+        #archived orders are all older than anything still in the hot table
+        archived = archive.orders_for_user(db, user_id) if settings.ORDER_ARCHIVE_ENABLED else []
+        logger.info("Fetched %d orders (%d archived) for user: %s", len(orders) + len(archived), len(archived), user_id)
+        return orders + archived
     except Exception as e:
         logger.exception("Error while fetching order history for user %s: %s", user_id, str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -34,17 +37,26 @@ def get_order_history(
 @router.get("/{order_id}", response_model=schemas.OrderDetailResponse)
 def get_order_detail(
     order_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user_id: UUID = Depends(get_current_user_id)
 ):
     try:
         logger.debug("Fetching order detail for order %s by user %s", order_id, user_id)
         order = db.query(Order).filter(Order.id == order_id, Order.user_id == user_id).first()
+        #an id still in the hot table belongs to someone else, it can't be archived
+        if not order and settings.ORDER_ARCHIVE_ENABLED and not _in_hot_table(db, order_id):
+            order = archive.get_order(db, order_id, user_id)
         if not order:
             logger.warning("Order %s not found for user %s", order_id, user_id)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
         logger.info("Order %s retrieved successfully for user %s", order_id, user_id)
         return order
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Error while fetching order detail for order %s: %s", order_id, str(e))
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+def _in_hot_table(db: Session, order_id: UUID) -> bool:
+    return db.query(Order.id).filter(Order.id == order_id).first() is not None
@@ -11,6 +11,8 @@ class OrderItemBase(BaseModel):
 
 class OrderItemResponse(OrderItemBase):
     id: UUID
+    #promotion discount on the whole line
+    discount: float = 0
 
     class Config:
         from_attributes = True
@@ -39,6 +41,7 @@ class OrderSummaryResponse(BaseModel):
     id: UUID
     created_at: datetime
     total_amount: float
+    discount_amount: float = 0
     status: str
 
     class Config:
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from sqlalchemy import Float, Integer, cast, column, func, update, values
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.core.database import get_db
-from app.products import models, schemas
+from app.core.config import settings
+from app.core.database import get_db, record_write
+from app.products import models, schemas, cache, autocomplete, snapshot, feed, images
+from app.products.coalesce import flights
 from app.auth.dependencies import admin_required
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
-router = APIRouter(prefix="/admin/products", tags=["admin-products"])
+router = APIRouter(prefix="/admin/products", tags=["admin-products"], dependencies=[Depends(record_write)])
+
+#rows per UPDATE ... FROM (VALUES ...) statement in bulk patches
+BULK_PATCH_CHUNK_SIZE = 1000
 
 #add products
 @router.post("/", response_model=schemas.ProductResponse, dependencies=[Depends(admin_required)])
@@ -20,12 +26,120 @@ def create_product(product_in: schemas.ProductCreate, db: Session = Depends(get_
         db.add(product)
         db.commit()
         db.refresh(product)
+        autocomplete.index.upsert_product(product.id, product.name, product.category)
+        snapshot.request_publish()
         logger.info("Product created: %s", product.id)
         return product
     except Exception as e:
         logger.exception("Error while creating product: %s", str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
+#bulk reprice / restock, one UPDATE per chunk and one commit for the whole request
+@router.patch("/bulk", response_model=schemas.ProductBulkPatchResponse, dependencies=[Depends(admin_required)])
+def bulk_patch_products(patch: schemas.ProductBulkPatch, db: Session = Depends(get_db)):
+    try:
+        logger.debug("Bulk patching %d products", len(patch.items))
+        matched = {}
+        for start in range(0, len(patch.items), BULK_PATCH_CHUNK_SIZE):
+            matched.update(_apply_patch_chunk(db, patch.items[start:start + BULK_PATCH_CHUNK_SIZE]))
+        db.commit()
+
+        #caches are dropped once for the whole batch
+        cache.invalidate(matched)
+        snapshot.request_publish()
+        feed.publish(matched)
+
+        unmatched_ids = [item.id for item in patch.items if item.id not in matched]
+        rejected_ids = _rejected_ids(db, patch.items, unmatched_ids)
+        if rejected_ids:
+            rejected = set(rejected_ids)
+            unmatched_ids = [product_id for product_id in unmatched_ids if product_id not in rejected]
+        logger.info("Bulk patch matched %d products, %d unmatched, %d rejected",
+                    len(matched), len(unmatched_ids), len(rejected_ids))
+        return {
+            "matched": len(matched),
+            "unmatched": len(unmatched_ids),
+            "unmatched_ids": unmatched_ids,
+            "rejected": len(rejected_ids),
+            "rejected_ids": rejected_ids,
+        }
+    except Exception as e:
+        db.rollback()
+        logger.exception("Error while bulk patching products: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+#returns the new price and stock of every product that matched
+def _apply_patch_chunk(db: Session, items: List[schemas.ProductBulkPatchItem]) -> dict:
+    if db.get_bind().dialect.name == "sqlite":
+        return _apply_patch_rows(db, items)
+    patch = values(
+        column("id", models.Product.id.type),
+        column("price", Float),
+        column("price_delta", Float),
+        column("stock", Integer),
+        column("stock_delta", Integer),
+        name="patch",
+    ).data([(item.id, item.price, item.price_delta, item.stock, item.stock_delta) for item in items])
+
+    #casts keep all-NULL columns from being typed as text
+    price = func.coalesce(
+        cast(patch.c.price, Float),
+        models.Product.price + func.coalesce(cast(patch.c.price_delta, Float), 0),
+    )
+    stock = func.coalesce(
+        cast(patch.c.stock, Integer),
+        models.Product.stock + func.coalesce(cast(patch.c.stock_delta, Integer), 0),
+    )
+    stmt = (
+        update(models.Product)
+        .where(models.Product.id == cast(patch.c.id, models.Product.id.type))
+        #a delta that would take price to zero or stock below zero skips the row, see _rejected_ids
+        .where(cast(patch.c.price_delta, Float).is_(None) | (price > 0))
+        .where(cast(patch.c.stock_delta, Integer).is_(None) | (stock >= 0))
+        .values(price=price, stock=stock)
+        .returning(models.Product.id, models.Product.price, models.Product.stock)
+    )
+    return {row.id: {"price": row.price, "stock": row.stock} for row in db.execute(stmt)}
+
+
+#sqlite can't name the columns of a VALUES list, so tests and benchmarks patch row by row
+def _apply_patch_rows(db: Session, items: List[schemas.ProductBulkPatchItem]) -> dict:
+    matched = {}
+    for item in items:
+        price = models.Product.price + (item.price_delta or 0) if item.price is None else item.price
+        stock = models.Product.stock + (item.stock_delta or 0) if item.stock is None else item.stock
+        stmt = update(models.Product).where(models.Product.id == item.id)
+        if item.price_delta is not None:
+            stmt = stmt.where(price > 0)
+        if item.stock_delta is not None:
+            stmt = stmt.where(stock >= 0)
+        stmt = (
+            stmt.values(price=price, stock=stock)
+            .returning(models.Product.id, models.Product.price, models.Product.stock)
+        )
+        for row in db.execute(stmt):
+            matched[row.id] = {"price": row.price, "stock": row.stock}
+    return matched
+
+
+#products that exist but weren't updated because a delta would have taken the
+#price to zero or below or the stock below zero, only delta items can fail that way
+def _rejected_ids(db: Session, items: List[schemas.ProductBulkPatchItem], unmatched_ids: List) -> List:
+    unmatched = set(unmatched_ids)
+    candidates = [
+        item.id for item in items
+        if (item.price_delta is not None or item.stock_delta is not None) and item.id in unmatched
+    ]
+    if not candidates:
+        return []
+    existing = set()
+    for start in range(0, len(candidates), BULK_PATCH_CHUNK_SIZE):
+        chunk = candidates[start:start + BULK_PATCH_CHUNK_SIZE]
+        existing.update(row.id for row in db.query(models.Product.id).filter(models.Product.id.in_(chunk)))
+    return [product_id for product_id in candidates if product_id in existing]
+
+
 #get all products
 @router.get("/", response_model=List[schemas.ProductResponse], dependencies=[Depends(admin_required)])
 def list_products(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
@@ -38,6 +152,17 @@ def list_products(skip: int = 0, limit: int = 10, db: Session = Depends(get_db))
         logger.exception("Error while listing products: %s", str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
+#coalescing stats, per group: queries actually run, requests that shared one,
+#and calls in flight on this worker; registered before /{product_id}
+@router.get("/coalescing", dependencies=[Depends(admin_required)])
+def get_coalescing_stats():
+    return flights.stats()
+
+
+@router.delete("/coalescing", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(admin_required)])
+def reset_coalescing_stats():
+    flights.reset_stats()
+
 #get a product by id
 @router.get("/{product_id}", response_model=schemas.ProductResponse, dependencies=[Depends(admin_required)])
 def get_product(product_id: str, db: Session = Depends(get_db)):
@@ -62,11 +187,18 @@ def update_product(product_id: str, product_in: schemas.ProductCreate, db: Sessi
             logger.warning("Product not found for update: %s", product_id)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
 
+        changes = {}
         for field, value in product_in.model_dump(exclude_unset=True).items():
+            if getattr(product, field) != value:
+                changes[field] = value
             setattr(product, field, value)
 
         db.commit()
         db.refresh(product)
+        cache.invalidate([product.id])
+        feed.publish({product.id: changes})
+        autocomplete.index.upsert_product(product.id, product.name, product.category)
+        snapshot.request_publish()
         logger.info("Product updated: %s", product_id)
         return product
     except Exception as e:
@@ -85,7 +217,46 @@ def delete_product(product_id: str, db: Session = Depends(get_db)):
 
         db.delete(product)
         db.commit()
+        cache.invalidate([product.id])
+        autocomplete.index.remove_product(product.id)
+        feed.publish({product.id: {"deleted": True}})
+        snapshot.request_publish()
         logger.info("Product deleted: %s", product_id)
     except Exception as e:
         logger.exception("Error while deleting product %s: %s", product_id, str(e))
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+#image upload, resized variants are generated in the background
+@router.post("/{product_id}/image", response_model=schemas.ProductResponse, dependencies=[Depends(admin_required)])
+def upload_product_image(product_id: str, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    try:
+        logger.debug("Uploading image for product: %s", product_id)
+        product = db.query(models.Product).filter(models.Product.id == product_id).first()
+        if not product:
+            logger.warning("Product not found for image upload: %s", product_id)
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+
+        data = file.file.read(settings.IMAGE_MAX_UPLOAD_BYTES + 1)
+        if len(data) > settings.IMAGE_MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image too large")
+        try:
+            key = images.store_original(data)
+        except images.InvalidImage as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        product.image_key = key
+        product.image_url = images.variant_urls(key)["original"]
+        db.commit()
+        db.refresh(product)
+        images.schedule_variants(key)
+
+        cache.invalidate([product.id])
+        snapshot.request_publish()
+        feed.publish({product.id: {"image_url": product.image_url}})
+        logger.info("Image %s stored for product: %s", key, product_id)
+        return product
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while uploading image for product %s: %s", product_id, str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,251 @@
+import bisect
+import heapq
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+from app.orders.models import OrderItem
+from app.products.models import Product
+
+logger = setup_logger(__name__)
+
+PRODUCT = "product"
+CATEGORY = "category"
+
+#cached answers for hot prefixes; catalog changes drop them all, a sale only
+#drops the prefixes that can reach what it sold
+MEMO_MAX_ENTRIES = 2048
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+#every word start of a name is a key, so "case" finds "iphone case"
+def _keys_for(text: str) -> List[str]:
+    words = normalize(text).split(" ")
+    return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+#sorted array of (key, kind, ref) answered with two bisects per prefix
+#ref is the product id for products and the category name for categories
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Lock()
+        self._keys: List[Tuple[str, str, str]] = []
+        self._products: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._popularity: Dict[str, int] = {}
+        #category -> (product count, units sold)
+        self._categories: Dict[str, List[int]] = {}
+        #prefix -> limit -> suggestions
+        self._memo: Dict[str, Dict[int, List[dict]]] = {}
+        #writes made while a build runs, replayed onto the new index before the swap
+        self._replay: Optional[List[Callable[["PrefixIndex"], None]]] = None
+        self.built_at = None
+
+    def build(self, db: Session):
+        started = time.monotonic()
+        with self._lock:
+            self._replay = []
+        try:
+            products = db.query(Product.id, Product.name, Product.category).all()
+            sold = dict(
+                db.query(OrderItem.product_id, func.sum(OrderItem.quantity))
+                .group_by(OrderItem.product_id)
+                .all()
+            )
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+
+        fresh = PrefixIndex()
+        for product_id, name, category in products:
+            fresh._add(str(product_id), name, category, int(sold.get(product_id) or 0))
+        fresh._keys.sort()
+
+        with self._lock:
+            #upserts and removes are idempotent; a sale committed just before the
+            #query can be counted twice, a dropped one would stay missing
+            for write in self._replay:
+                write(fresh)
+            replayed = len(self._replay)
+            self._replay = None
+            self._keys = fresh._keys
+            self._products = fresh._products
+            self._popularity = fresh._popularity
+            self._categories = fresh._categories
+            self._memo = {}
+            self.built_at = time.monotonic()
+        logger.info("Built autocomplete index: %d keys for %d products, %d writes replayed in %.3fs",
+                    len(self._keys), len(self._products), replayed, time.monotonic() - started)
+
+    def ensure_built(self, session_factory):
+        if self.built_at is not None:
+            return
+        with self._rebuilding:
+            if self.built_at is None:
+                db = session_factory()
+                try:
+                    self.build(db)
+                finally:
+                    db.close()
+
+    def is_stale(self) -> bool:
+        return (
+            self.built_at is None
+            or time.monotonic() - self.built_at > settings.AUTOCOMPLETE_REBUILD_SECONDS
+        )
+
+    #picks up admin writes made on other workers
+    def rebuild_async(self, session_factory):
+        if not self._rebuilding.acquire(blocking=False):
+            return
+
+        def run():
+            db = session_factory()
+            try:
+                self.build(db)
+            except Exception as e:
+                logger.exception("Autocomplete index rebuild failed: %s", str(e))
+            finally:
+                db.close()
+                self._rebuilding.release()
+
+        threading.Thread(target=run, name="autocomplete-rebuild", daemon=True).start()
+
+    def complete(self, prefix: str, limit: int) -> List[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            cached = self._memo.get(prefix, {}).get(limit)
+            if cached is not None:
+                return cached
+
+            start = bisect.bisect_left(self._keys, (prefix,))
+            end = bisect.bisect_left(self._keys, (prefix + "\uffff",), lo=start)
+            #one product can match through several of its words
+            candidates = {(kind, ref) for _, kind, ref in self._keys[start:end]}
+            best = heapq.nlargest(limit, candidates, key=self._score)
+            results = [self._suggestion(kind, ref) for kind, ref in best]
+
+            if len(self._memo) >= MEMO_MAX_ENTRIES and prefix not in self._memo:
+                self._memo.clear()
+            self._memo.setdefault(prefix, {})[limit] = results
+            return results
+
+    def upsert_product(self, product_id: UUID, name: str, category: Optional[str]):
+        ref = str(product_id)
+        self._write(lambda index: index._upsert(ref, name, category))
+
+    def remove_product(self, product_id: UUID):
+        ref = str(product_id)
+        self._write(lambda index: index._remove(ref))
+
+    #called after checkout with (product_id, quantity) pairs
+    def record_sales(self, lines: Iterable[Tuple[UUID, int]]):
+        lines = [(str(product_id), quantity) for product_id, quantity in lines]
+        self._write(lambda index: index._record_sales(lines), lambda index: index._sale_keys(lines))
+
+    #applies a write now and, while a build runs, keeps it for the new index;
+    #without affected_keys every memoized prefix is dropped
+    def _write(self, write: Callable[["PrefixIndex"], None],
+               affected_keys: Optional[Callable[["PrefixIndex"], Iterable[str]]] = None):
+        with self._lock:
+            write(self)
+            if self._replay is not None:
+                self._replay.append(write)
+            if affected_keys is None:
+                self._memo.clear()
+            else:
+                self._forget(affected_keys(self))
+
+    #a memoized prefix can only change if it is a prefix of one of these keys
+    def _forget(self, keys: Iterable[str]):
+        for key in keys:
+            for end in range(1, len(key) + 1):
+                self._memo.pop(key[:end], None)
+
+    #keys whose score a sale changes, the product's and its category's
+    def _sale_keys(self, lines: List[Tuple[str, int]]) -> List[str]:
+        keys = []
+        for ref, _ in lines:
+            if ref not in self._products:
+                continue
+            name, category = self._products[ref]
+            keys.extend(_keys_for(name))
+            if category:
+                keys.extend(_keys_for(category))
+        return keys
+
+    def _upsert(self, ref: str, name: str, category: Optional[str]):
+        popularity = self._popularity.get(ref, 0)
+        self._remove(ref)
+        self._add(ref, name, category, popularity, keep_sorted=True)
+
+    def _record_sales(self, lines: List[Tuple[str, int]]):
+        for ref, quantity in lines:
+            if ref not in self._products:
+                continue
+            self._popularity[ref] += quantity
+            category = self._products[ref][1]
+            if category:
+                self._categories[category][1] += quantity
+
+    def _score(self, candidate: Tuple[str, str]) -> int:
+        kind, ref = candidate
+        if kind == PRODUCT:
+            return self._popularity.get(ref, 0)
+        return self._categories.get(ref, (0, 0))[1]
+
+    def _suggestion(self, kind: str, ref: str) -> dict:
+        if kind == PRODUCT:
+            return {"text": self._products[ref][0], "kind": PRODUCT, "product_id": ref}
+        return {"text": ref, "kind": CATEGORY, "product_id": None}
+
+    def _add(self, ref: str, name: str, category: Optional[str], popularity: int, keep_sorted: bool = False):
+        insert = bisect.insort if keep_sorted else lambda keys, entry: keys.append(entry)
+        self._products[ref] = (name, category)
+        self._popularity[ref] = popularity
+        for key in _keys_for(name):
+            insert(self._keys, (key, PRODUCT, ref))
+        if category:
+            counts = self._categories.setdefault(category, [0, 0])
+            if counts[0] == 0:
+                for key in _keys_for(category):
+                    insert(self._keys, (key, CATEGORY, category))
+            counts[0] += 1
+            counts[1] += popularity
+
+    def _remove(self, ref: str):
+        existing = self._products.pop(ref, None)
+        if existing is None:
+            return
+        name, category = existing
+        popularity = self._popularity.pop(ref, 0)
+        for key in _keys_for(name):
+            self._discard((key, PRODUCT, ref))
+        if category:
+            counts = self._categories[category]
+            counts[0] -= 1
+            counts[1] -= popularity
+            if counts[0] == 0:
+                del self._categories[category]
+                for key in _keys_for(category):
+                    self._discard((key, CATEGORY, category))
+
+    def _discard(self, entry: Tuple[str, str, str]):
+        position = bisect.bisect_left(self._keys, entry)
+        if position < len(self._keys) and self._keys[position] == entry:
+            del self._keys[position]
+
+
+index = PrefixIndex()
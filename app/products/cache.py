@@ -0,0 +1,59 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+
+from app.core.config import settings
+from app.products import schemas
+
+#per-worker cache of serialized products keyed by id
+#entries are plain dicts so they outlive the session that loaded them
+_lock = threading.Lock()
+_entries: Dict[UUID, tuple[float, dict]] = {}
+
+
+def get_many(product_ids: Iterable[UUID]) -> Dict[UUID, dict]:
+    now = time.monotonic()
+    found = {}
+    with _lock:
+        for product_id in product_ids:
+            entry = _entries.get(product_id)
+            if entry is None:
+                continue
+            expires_at, data = entry
+            if expires_at < now:
+                del _entries[product_id]
+                continue
+            found[product_id] = data
+    return found
+
+
+#accepts ORM products or anything ProductResponse can validate
+def set_many(products: Iterable) -> Dict[UUID, dict]:
+    expires_at = time.monotonic() + settings.PRODUCT_CACHE_TTL_SECONDS
+    stored = {}
+    for product in products:
+        data = schemas.ProductResponse.model_validate(product, from_attributes=True).model_dump()
+        stored[data["id"]] = data
+
+    with _lock:
+        #crude bound: drop everything rather than track recency
+        if len(_entries) + len(stored) > settings.PRODUCT_CACHE_MAX_ENTRIES:
+            _entries.clear()
+        for product_id, data in stored.items():
+            _entries[product_id] = (expires_at, data)
+    return stored
+
+
+#None clears the whole cache
+def invalidate(product_ids: Optional[Iterable[UUID]] = None):
+    with _lock:
+        if product_ids is None:
+            _entries.clear()
+            return
+        for product_id in product_ids:
+            _entries.pop(_as_uuid(product_id), None)
+
+
+def _as_uuid(value) -> UUID:
+    return value if isinstance(value, UUID) else UUID(str(value))
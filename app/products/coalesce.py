@@ -0,0 +1,81 @@
+import threading
+from typing import Callable, Dict, Hashable
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+#raised in each waiting request when the shared call failed, chained to the
+#leader's exception; re-raising that one object from many threads would mix
+#their tracebacks
+class CoalescedError(Exception):
+    pass
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+#single-flight: identical requests that arrive while one is already running
+#wait for it and share its result instead of issuing the same query again;
+#nothing is kept once the call finishes, so this is not a cache
+class SingleFlight:
+    def __init__(self, wait_timeout: float):
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, group: str, key: Hashable, fn: Callable[[], bytes]) -> bytes:
+        key = (group, key)
+        with self._lock:
+            stats = self._stats.setdefault(group, {"executed": 0, "coalesced": 0, "errors": 0, "timeouts": 0})
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                stats["executed"] += 1
+            else:
+                stats["coalesced"] += 1
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise CoalescedError(f"shared {group} call failed: {call.error}") from call.error
+                return call.result
+            #the leader is stuck, don't pile everyone up behind it
+            with self._lock:
+                stats["timeouts"] += 1
+            return fn()
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                group: {**counts, "in_flight": sum(1 for key in self._calls if key[0] == group)}
+                for group, counts in self._stats.items()
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+flights = SingleFlight(settings.COALESCE_WAIT_SECONDS)
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import threading
+from typing import Dict, Iterable, Optional, Set
+from uuid import UUID
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+#one SSE client, pending holds the latest change per product so a slow
+#client gets merged state instead of an ever growing backlog
+class Subscription:
+    def __init__(self, product_ids: Set[UUID], loop: asyncio.AbstractEventLoop):
+        self.product_ids = product_ids
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self._lock = threading.Lock()
+        self._pending: Dict[UUID, dict] = {}
+        self._notified = False
+        self.closed = False
+
+    #called from request threads, hands the wakeup to the subscriber's loop
+    def offer(self, product_id: UUID, change: dict):
+        with self._lock:
+            self._pending.setdefault(product_id, {}).update(change)
+            if self._notified:
+                return
+            self._notified = True
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  #loop already closed, the stream is going away
+
+    async def wait(self):
+        await self._ready.wait()
+
+    def drain(self) -> Dict[UUID, dict]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._notified = False
+            self._ready.clear()
+        return pending
+
+
+class ChangeHub:
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._by_product: Dict[UUID, Set[Subscription]] = {}
+        self._connections = 0
+
+    #None once this worker is at its connection cap
+    def subscribe(self, product_ids: Iterable[UUID], loop: asyncio.AbstractEventLoop) -> Optional[Subscription]:
+        subscription = Subscription(set(product_ids), loop)
+        with self._lock:
+            if self._connections >= self.max_connections:
+                return None
+            self._connections += 1
+            for product_id in subscription.product_ids:
+                self._by_product.setdefault(product_id, set()).add(subscription)
+        return subscription
+
+    #safe to call more than once, only the first call frees the slot
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self._connections -= 1
+            for product_id in subscription.product_ids:
+                subscribers = self._by_product.get(product_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_product[product_id]
+
+    #changes maps product id -> changed fields, e.g. {"stock": 3}
+    def publish(self, changes: Dict[UUID, dict]):
+        with self._lock:
+            targets = [(product_id, list(self._by_product[product_id]))
+                       for product_id in changes if product_id in self._by_product]
+        for product_id, subscribers in targets:
+            for subscription in subscribers:
+                subscription.offer(product_id, changes[product_id])
+
+    @property
+    def connections(self) -> int:
+        return self._connections
+
+
+hub = ChangeHub(settings.SSE_MAX_CONNECTIONS)
+
+
+def publish(changes: Dict[UUID, dict]):
+    changes = {product_id: change for product_id, change in changes.items() if change}
+    if changes:
+        hub.publish(changes)
+
+
+async def stream(subscription: Subscription, request: Request):
+    yield "retry: 5000\n\n"
+    while True:
+        try:
+            await asyncio.wait_for(subscription.wait(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            if await request.is_disconnected():
+                break
+            yield ": keep-alive\n\n"
+            continue
+
+        for product_id, change in subscription.drain().items():
+            yield f"event: product\ndata: {json.dumps({'id': str(product_id), **change})}\n\n"
+        #updates landing in this window get merged into the next event
+        await asyncio.sleep(settings.SSE_FLUSH_INTERVAL_SECONDS)
+
+
+#the slot is taken in the handler so a full worker can still answer 503, and freed
+#here rather than in stream(): a client that leaves before the body starts never
+#runs the generator, but the response itself is always awaited
+class FeedResponse(StreamingResponse):
+    def __init__(self, subscription: Subscription, request: Request, **kwargs):
+        super().__init__(stream(subscription, request), media_type="text/event-stream", **kwargs)
+        self.subscription = subscription
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            hub.unsubscribe(self.subscription)
+            logger.debug("Feed subscriber left, %d connected", hub.connections)
@@ -0,0 +1,136 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+#formats accepted for originals, mapped to the extension they are stored under
+ACCEPTED_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+#every width gets a webp and a jpeg fallback
+VARIANT_FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+#layout under MEDIA_ROOT, keys are "<sha256>.<ext>" so equal uploads share files
+#  originals/ab/<key>
+#  variants/ab/<key>/<width>.<webp|jpg>
+def original_path(key: str) -> str:
+    return f"originals/{key[:2]}/{key}"
+
+
+def variant_path(key: str, width: int, ext: str) -> str:
+    return f"variants/{key[:2]}/{key}/{width}.{ext}"
+
+
+def variant_urls(key: str) -> Dict[str, str]:
+    prefix = settings.MEDIA_URL_PREFIX.rstrip("/")
+    urls = {"original": f"{prefix}/{original_path(key)}"}
+    for width in settings.IMAGE_VARIANT_WIDTHS:
+        for ext in VARIANT_FORMATS:
+            urls[f"{width}.{ext}"] = f"{prefix}/{variant_path(key, width, ext)}"
+    return urls
+
+
+#validates and stores the upload, returns its content key
+def store_original(data: bytes) -> str:
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format = image.format
+    except Exception:
+        raise InvalidImage("not a readable image")
+    if image_format not in ACCEPTED_FORMATS:
+        raise InvalidImage(f"unsupported image format {image_format}")
+
+    key = f"{hashlib.sha256(data).hexdigest()}.{ACCEPTED_FORMATS[image_format]}"
+    path = os.path.join(settings.MEDIA_ROOT, original_path(key))
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, data)
+    return key
+
+
+#fire and forget, the upload request doesn't wait for resizing
+def schedule_variants(key: str):
+    future = _executor().submit(generate_variants, settings.MEDIA_ROOT, key, list(settings.IMAGE_VARIANT_WIDTHS))
+    future.add_done_callback(lambda f: _log_result(key, f))
+
+
+#runs in the process pool, idempotent since outputs are keyed by content
+def generate_variants(media_root: str, key: str, widths: List[int]) -> int:
+    created = 0
+    with Image.open(os.path.join(media_root, original_path(key))) as original:
+        original.load()
+        for width in widths:
+            for ext, image_format in VARIANT_FORMATS.items():
+                path = os.path.join(media_root, variant_path(key, width, ext))
+                if os.path.exists(path):
+                    continue
+                resized = original.copy()
+                resized.thumbnail((width, width * 4))
+                if image_format == "JPEG" and resized.mode not in ("RGB", "L"):
+                    resized = resized.convert("RGB")
+                buffer = io.BytesIO()
+                resized.save(buffer, image_format, quality=82, optimize=True)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _write_atomic(path, buffer.getvalue())
+                created += 1
+    return created
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def resolve(relative: str) -> Optional[str]:
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(root, relative))
+    #refuse anything that escapes the media root
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                #spawn, forking a process full of threads is asking for trouble
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def _log_result(key: str, future):
+    try:
+        logger.info("Generated %d image variants for %s", future.result(), key)
+    except Exception as e:
+        logger.error("Image variant generation failed for %s: %s", key, str(e))
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
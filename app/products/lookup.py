@@ -0,0 +1,25 @@
+from sqlalchemy.orm import Session
+from typing import List
+from uuid import UUID
+
+from app.products import models, cache, snapshot
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+#shared snapshot, then the worker cache, then one IN query for the rest
+#returns serialized products by id; fresh skips both copies, for clients
+#pinned to the primary after a write
+def load_products(product_ids: List[UUID], db: Session, fresh: bool = False) -> dict:
+    found = {} if fresh else snapshot.get_many(product_ids)
+    from_snapshot = len(found)
+    if not fresh and len(found) < len(product_ids):
+        found.update(cache.get_many(product_id for product_id in product_ids if product_id not in found))
+    pending = [product_id for product_id in product_ids if product_id not in found]
+    if pending:
+        rows = db.query(models.Product).filter(models.Product.id.in_(pending)).all()
+        found.update(cache.set_many(rows))
+    logger.debug("Loaded %d products, %d from snapshot, %d from cache",
+                 len(found), from_snapshot, len(product_ids) - len(pending) - from_snapshot)
+    return found
@@ -0,0 +1,32 @@
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.products import images
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+router = APIRouter(prefix="/media", tags=["media"])
+
+#paths are content addressed, so a url never changes what it points to
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+#served in place of a variant that is still being generated
+FALLBACK_CACHE = "public, max-age=60"
+
+
+@router.get("/{path:path}")
+def get_media(path: str):
+    resolved = images.resolve(path)
+    if resolved is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    if os.path.isfile(resolved):
+        return FileResponse(resolved, headers={"Cache-Control": IMMUTABLE_CACHE})
+
+    #variants/ab/<key>/<width>.<ext> falls back to the original until it exists
+    parts = path.split("/")
+    if len(parts) == 4 and parts[0] == "variants":
+        original = images.resolve(images.original_path(parts[2]))
+        if original is not None and os.path.isfile(original):
+            logger.debug("Variant not ready, serving original: %s", path)
+            return FileResponse(original, headers={"Cache-Control": FALLBACK_CACHE})
+    raise HTTPException(status_code=404, detail="Not found")
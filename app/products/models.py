@@ -1,15 +1,16 @@
 import uuid
-from sqlalchemy import Column, String, Float, Integer
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Float, Integer, Uuid
 from app.core.database import Base
 
 class Product(Base):
     __tablename__ = "products"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     price = Column(Float, nullable=False)
     stock = Column(Integer, nullable=False)
     category = Column(String, nullable=True)
     image_url = Column(String, nullable=True)
+    #content key of an uploaded image, variant urls are derived from it
+    image_key = Column(String, nullable=True)
@@ -1,53 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 
-from app.core.database import get_db
-from app.products import models, schemas
+from app.core.config import settings
+from app.core.database import get_read_db, new_read_session, wrote_recently
+from app.products import models, schemas, recommendations, autocomplete, feed, lookup
+from app.products.coalesce import flights
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
 router = APIRouter(prefix="/products", tags=["public-products"])
 
+#upper bound on ids per batched lookup
+MAX_BATCH_IDS = 100
+
+_product_list = TypeAdapter(List[schemas.ProductResponse])
+
 #product listing
 @router.get("/", response_model=List[schemas.ProductResponse])
 def list_products(
+    request: Request,
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     sort_by: Optional[str] = Query(None, regex="^(price|name)_(asc|desc)$"),
     page: int = 1,
     page_size: int = 10,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     try:
         logger.debug("Listing products: category=%s, min_price=%s, max_price=%s, sort_by=%s, page=%d, page_size=%d",
                      category, min_price, max_price, sort_by, page, page_size)
 
-        query = db.query(models.Product)
+        def run() -> bytes:
+            query = db.query(models.Product)
 
-        #filtering logic
-        if category:
-            query = query.filter(models.Product.category == category)
-        if min_price is not None:
-            query = query.filter(models.Product.price >= min_price)
-        if max_price is not None:
-            query = query.filter(models.Product.price <= max_price)
+            #filtering logic
+            if category:
+                query = query.filter(models.Product.category == category)
+            if min_price is not None:
+                query = query.filter(models.Product.price >= min_price)
+            if max_price is not None:
+                query = query.filter(models.Product.price <= max_price)
 
-        if sort_by:
-            field, direction = sort_by.split("_")
-            column = getattr(models.Product, field)
-            if direction == "desc":
-                column = column.desc()
-            query = query.order_by(column)
+            if sort_by:
+                field, direction = sort_by.split("_")
+                column = getattr(models.Product, field)
+                if direction == "desc":
+                    column = column.desc()
+                query = query.order_by(column)
 
-        #Using pagination to split the data to multiple pages
-        offset = (page - 1) * page_size
-        products = query.offset(offset).limit(page_size).all()
+            #Using pagination to split the data to multiple pages
+            offset = (page - 1) * page_size
+            products = query.offset(offset).limit(page_size).all()
+            logger.info("Returned %d products", len(products))
+            return _serialize(products)
 
-        logger.info("Returned %d products", len(products))
-        return products
+        key = (category, min_price, max_price, sort_by, page, page_size)
+        return _json(_coalesced(request, "list_products", key, run))
 
     except Exception as e:
         logger.exception("Error while listing products: %s", str(e))
@@ -58,33 +71,141 @@ def list_products(
 @router.get("/search", response_model=List[schemas.ProductResponse])
 def search_products(
     keyword: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_read_db)
 ):
     try:
         logger.debug("Searching products with keyword: %s", keyword)
-        query = db.query(models.Product).filter(
-            (models.Product.name.ilike(f"%{keyword}%")) |
-            (models.Product.description.ilike(f"%{keyword}%"))
-        )
-        results = query.all()
-        logger.info("Search returned %d products for keyword: %s", len(results), keyword)
-        return results
+
+        def run() -> bytes:
+            query = db.query(models.Product).filter(
+                (models.Product.name.ilike(f"%{keyword}%")) |
+                (models.Product.description.ilike(f"%{keyword}%"))
+            )
+            results = query.all()
+            logger.info("Search returned %d products for keyword: %s", len(results), keyword)
+            return _serialize(results)
+
+        #ilike ignores case, so keywords differing only in case share a query
+        return _json(_coalesced(request, "search_products", keyword.lower(), run))
     except Exception as e:
         logger.exception("Error while searching products: %s", str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+#search-as-you-type, answered from the in-memory prefix index
+@router.get("/autocomplete", response_model=List[schemas.AutocompleteSuggestion])
+def autocomplete_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+):
+    try:
+        autocomplete.index.ensure_built(new_read_session)
+        if autocomplete.index.is_stale():
+            autocomplete.index.rebuild_async(new_read_session)
+        return autocomplete.index.complete(q, limit)
+    except Exception as e:
+        logger.exception("Error while completing %s: %s", q, str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+#live stock/price deltas for a set of products, as server-sent events
+@router.get("/feed")
+async def product_feed(request: Request, ids: List[UUID] = Query(...)):
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per subscription")
+    subscription = feed.hub.subscribe(ids, asyncio.get_running_loop())
+    if subscription is None:
+        logger.warning("Feed connection rejected, %d connected", feed.hub.connections)
+        raise HTTPException(status_code=503, detail="Too many feed connections", headers={"Retry-After": "5"})
+    logger.debug("Feed subscriber joined for %d products, %d connected", len(ids), feed.hub.connections)
+    return feed.FeedResponse(
+        subscription,
+        request,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+#batched lookup, one query for whatever the cache doesn't have
+@router.get("/batch", response_model=schemas.ProductBatchResponse)
+def get_products_batch(
+    request: Request,
+    ids: List[UUID] = Query(...),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        if len(ids) > MAX_BATCH_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+
+        logger.debug("Fetching %d products by ID", len(ids))
+        unique_ids = list(dict.fromkeys(ids))
+        found = lookup.load_products(unique_ids, db, fresh=wrote_recently(request))
+
+        products = [found[product_id] for product_id in ids if product_id in found]
+        missing = [product_id for product_id in unique_ids if product_id not in found]
+        logger.info("Batch returned %d products, %d missing", len(products), len(missing))
+        return {"products": products, "missing": missing}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while fetching product batch: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+#frequently bought together
+@router.get("/{product_id}/related", response_model=List[schemas.ProductResponse])
+def get_related_products(
+    request: Request,
+    product_id: UUID,
+    limit: int = Query(10, ge=1, le=settings.RECOMMENDATIONS_TOP_K),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        logger.debug("Fetching related products for: %s", product_id)
+        recommendations.index.ensure_built(db)
+        if recommendations.index.is_stale():
+            recommendations.index.rebuild_async(new_read_session)
+
+        related_ids = recommendations.index.related(product_id, limit)
+        found = lookup.load_products(related_ids, db, fresh=wrote_recently(request))
+        #deleted products can linger in the index until the next rebuild
+        products = [found[related_id] for related_id in related_ids if related_id in found]
+        logger.info("Returned %d related products for: %s", len(products), product_id)
+        return products
+    except Exception as e:
+        logger.exception("Error while fetching related products for %s: %s", product_id, str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 #view details
 @router.get("/{product_id}", response_model=schemas.ProductResponse)
-def get_product(product_id: UUID, db: Session = Depends(get_db)):
+def get_product(request: Request, product_id: UUID, db: Session = Depends(get_read_db)):
     try:
         logger.debug("Fetching products by ID: %s", product_id)
-        product = db.query(models.Product).filter(models.Product.id == product_id).first()
+        product = lookup.load_products([product_id], db, fresh=wrote_recently(request)).get(product_id)
         if not product:
             logger.warning("Product not found: %s", product_id)
             raise HTTPException(status_code=404, detail="Product not found")
         logger.info("Product fetched: %s", product_id)
         return product
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Error while fetching product %s: %s", product_id, str(e))
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+#identical in-flight queries run once and share the serialized body; clients
+#pinned to the primary after a write skip it so they never get an older read
+def _coalesced(request: Request, group: str, key, run) -> bytes:
+    if not settings.COALESCE_ENABLED or wrote_recently(request):
+        return run()
+    return flights.do(group, key, run)
+
+
+def _serialize(products) -> bytes:
+    return _product_list.dump_json(_product_list.validate_python(products, from_attributes=True))
+
+
+def _json(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,219 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+from app.orders.models import OrderItem
+
+logger = setup_logger(__name__)
+
+#pending co-purchase pairs are folded into the matrix once there are this many
+FOLD_THRESHOLD = 5000
+
+
+#"frequently bought together" from a product x product co-occurrence matrix
+#built from order_items, top-k neighbours per product are precomputed
+class CoPurchaseIndex:
+    def __init__(self, top_k: int):
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Lock()
+        self._positions: Dict[UUID, int] = {}
+        self._ids: List[UUID] = []
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.int32)
+        #row -> column indices ordered by score, -1 padded
+        self._top = np.empty((0, top_k), dtype=np.int32)
+        #co-purchases since the last fold, row -> {column: count}
+        self._pending: Dict[int, Dict[int, int]] = {}
+        self._pending_count = 0
+        self._dirty = set()
+        #orders recorded while a build runs, replayed onto the new index before the swap
+        self._replay: Optional[List[List[UUID]]] = None
+        self.built_at = None
+
+    def build(self, db: Session):
+        started = time.monotonic()
+        with self._lock:
+            self._replay = []
+        try:
+            fresh = self._load(db)
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+
+        with self._lock:
+            #an order committed just before the query can be counted twice, a
+            #dropped one would stay missing until the next rebuild
+            for product_ids in self._replay:
+                fresh._record(product_ids)
+            replayed = len(self._replay)
+            self._replay = None
+            self._positions = fresh._positions
+            self._ids = fresh._ids
+            self._matrix = fresh._matrix
+            self._top = fresh._top
+            self._pending = fresh._pending
+            self._pending_count = fresh._pending_count
+            self._dirty = fresh._dirty
+            self.built_at = time.monotonic()
+        logger.info("Built co-purchase index: %d products, %d pairs, %d orders replayed in %.2fs",
+                    len(self._ids), self._matrix.nnz, replayed, time.monotonic() - started)
+
+    def _load(self, db: Session) -> "CoPurchaseIndex":
+        rows = db.query(OrderItem.order_id, OrderItem.product_id).distinct().all()
+
+        positions: Dict[UUID, int] = {}
+        order_positions: Dict[UUID, int] = {}
+        order_idx = np.empty(len(rows), dtype=np.int64)
+        product_idx = np.empty(len(rows), dtype=np.int64)
+        for n, (order_id, product_id) in enumerate(rows):
+            order_idx[n] = order_positions.setdefault(order_id, len(order_positions))
+            product_idx[n] = positions.setdefault(product_id, len(positions))
+
+        #orders x products incidence, co-occurrence is its gram matrix
+        incidence = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (order_idx, product_idx)),
+            shape=(len(order_positions), len(positions)),
+        )
+        matrix = (incidence.T @ incidence).tocsr()
+        matrix.setdiag(0)
+        matrix.eliminate_zeros()
+        fresh = CoPurchaseIndex(self.top_k)
+        fresh._positions = positions
+        fresh._ids = list(positions)
+        fresh._matrix = matrix
+        fresh._top = _top_k_rows(matrix, self.top_k)
+        return fresh
+
+    #called after checkout, only touches the rows of the purchased products
+    def record_order(self, product_ids: Iterable[UUID]):
+        product_ids = list(dict.fromkeys(product_ids))
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append(product_ids)
+            if self.built_at is None:
+                return
+            self._record(product_ids)
+
+    def _record(self, product_ids: List[UUID]):
+        rows = [self._position(product_id) for product_id in product_ids]
+        for row in rows:
+            pending_row = self._pending.setdefault(row, {})
+            for column in rows:
+                if column != row:
+                    pending_row[column] = pending_row.get(column, 0) + 1
+                    self._pending_count += 1
+            self._dirty.add(row)
+        if self._pending_count >= FOLD_THRESHOLD:
+            self._fold()
+
+    def related(self, product_id: UUID, limit: int) -> List[UUID]:
+        with self._lock:
+            row = self._positions.get(product_id)
+            if row is None:
+                return []
+            if row in self._dirty:
+                self._refresh_row(row)
+            columns = self._top[row, :limit]
+            return [self._ids[column] for column in columns if column >= 0]
+
+    def is_stale(self) -> bool:
+        return (
+            self.built_at is None
+            or time.monotonic() - self.built_at > settings.RECOMMENDATIONS_REBUILD_SECONDS
+        )
+
+    #first build happens inline, concurrent callers wait for it
+    def ensure_built(self, db: Session):
+        if self.built_at is not None:
+            return
+        with self._rebuilding:
+            if self.built_at is None:
+                self.build(db)
+
+    #rebuilds in a background thread, other orders and workers only show up this way
+    def rebuild_async(self, session_factory):
+        if not self._rebuilding.acquire(blocking=False):
+            return
+
+        def run():
+            db = session_factory()
+            try:
+                self.build(db)
+            except Exception as e:
+                logger.exception("Co-purchase index rebuild failed: %s", str(e))
+            finally:
+                db.close()
+                self._rebuilding.release()
+
+        threading.Thread(target=run, name="copurchase-rebuild", daemon=True).start()
+
+    def _position(self, product_id: UUID) -> int:
+        row = self._positions.get(product_id)
+        if row is None:
+            row = len(self._ids)
+            self._positions[product_id] = row
+            self._ids.append(product_id)
+            size = len(self._ids)
+            self._matrix.resize((size, size))
+            self._top = np.vstack([self._top, np.full((1, self.top_k), -1, dtype=np.int32)])
+        return row
+
+    def _row_scores(self, row: int) -> Dict[int, int]:
+        start, end = self._matrix.indptr[row], self._matrix.indptr[row + 1]
+        scores = dict(zip(self._matrix.indices[start:end].tolist(), self._matrix.data[start:end].tolist()))
+        for column, count in self._pending.get(row, {}).items():
+            scores[column] = scores.get(column, 0) + count
+        return scores
+
+    def _refresh_row(self, row: int):
+        scores = self._row_scores(row)
+        columns = np.fromiter(scores.keys(), dtype=np.int32, count=len(scores))
+        counts = np.fromiter(scores.values(), dtype=np.int64, count=len(scores))
+        self._top[row] = _top_k(columns, counts, self.top_k)
+        self._dirty.discard(row)
+
+    #one sparse add for all pending pairs instead of one per order
+    def _fold(self):
+        rows, columns, counts = [], [], []
+        for row, pending_row in self._pending.items():
+            for column, count in pending_row.items():
+                rows.append(row)
+                columns.append(column)
+                counts.append(count)
+        delta = sparse.csr_matrix((counts, (rows, columns)), shape=self._matrix.shape, dtype=np.int32)
+        self._matrix = (self._matrix + delta).tocsr()
+        self._pending = {}
+        self._pending_count = 0
+        for row in list(self._dirty):
+            self._refresh_row(row)
+
+
+def _top_k(columns: np.ndarray, counts: np.ndarray, k: int) -> np.ndarray:
+    result = np.full(k, -1, dtype=np.int32)
+    if len(columns) > k:
+        keep = np.argpartition(-counts, k - 1)[:k]
+        columns, counts = columns[keep], counts[keep]
+    #highest count first, ties broken by column for stable output
+    order = np.lexsort((columns, -counts))
+    result[:len(order)] = columns[order]
+    return result
+
+
+def _top_k_rows(matrix: sparse.csr_matrix, k: int) -> np.ndarray:
+    top = np.full((matrix.shape[0], k), -1, dtype=np.int32)
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        if start != end:
+            top[row] = _top_k(matrix.indices[start:end], matrix.data[start:end], k)
+    return top
+
+
+index = CoPurchaseIndex(settings.RECOMMENDATIONS_TOP_K)
@@ -6,8 +6,10 @@ from typing import Optional
 from pydantic import BaseModel, HttpUrl 
 from typing import Optional
 
-from pydantic import BaseModel, field_validator, Field
-from typing import Optional
+from pydantic import BaseModel, field_validator, model_validator, computed_field, Field
+from typing import Dict, List, Optional
+
+from app.products.images import variant_urls
 
 class ProductBase(BaseModel):
     name: str = Field(strip_whitespace=True, min_length=1)
@@ -23,7 +25,63 @@ class ProductCreate(ProductBase):
 
 class ProductResponse(ProductBase):
     id: UUID
+    image_key: Optional[str] = None
+
+    #original plus resized webp/jpeg urls, keyed "original", "<width>.webp", "<width>.jpg"
+    @computed_field
+    @property
+    def images(self) -> Optional[Dict[str, str]]:
+        return variant_urls(self.image_key) if self.image_key else None
 
     #facilitates to work with ORM objects instead of dict
     class Config:
         orm_mode = True
+
+#batched lookup, products keep the order of the requested ids
+class ProductBatchResponse(BaseModel):
+    products: List[ProductResponse]
+    missing: List[UUID]
+
+
+class AutocompleteSuggestion(BaseModel):
+    text: str
+    kind: str  #"product" or "category"
+    product_id: Optional[UUID] = None
+
+
+#absolute value or delta per field, never both; omitted fields stay as they are
+class ProductBulkPatchItem(BaseModel):
+    id: UUID
+    price: Optional[float] = Field(None, gt=0)
+    price_delta: Optional[float] = None
+    stock: Optional[int] = Field(None, ge=0)
+    stock_delta: Optional[int] = None
+
+    @model_validator(mode="after")
+    def one_change_per_field(self):
+        if self.price is not None and self.price_delta is not None:
+            raise ValueError("give either price or price_delta")
+        if self.stock is not None and self.stock_delta is not None:
+            raise ValueError("give either stock or stock_delta")
+        if all(value is None for value in (self.price, self.price_delta, self.stock, self.stock_delta)):
+            raise ValueError("nothing to change")
+        return self
+
+
+class ProductBulkPatch(BaseModel):
+    items: List[ProductBulkPatchItem] = Field(..., min_length=1, max_length=50000)
+
+    @field_validator("items")
+    def unique_ids(cls, items):
+        if len({item.id for item in items}) != len(items):
+            raise ValueError("each product id may appear only once")
+        return items
+
+
+class ProductBulkPatchResponse(BaseModel):
+    matched: int
+    unmatched: int
+    unmatched_ids: List[UUID]
+    #left unchanged, a delta would have made the price zero or less or the stock negative
+    rejected: int = 0
+    rejected_ids: List[UUID] = []
@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+import numpy as np
+import pyarrow as pa
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logger import setup_logger
+from app.products.models import Product
+
+try:
+    import fcntl
+except ImportError:  #windows, publishers simply don't coordinate
+    fcntl = None
+
+logger = setup_logger(__name__)
+
+#read-only columnar copy of the public catalog, one uncompressed Arrow IPC file
+#every worker memory-maps the same file, so the pages are shared across processes
+SCHEMA = pa.schema([
+    ("id", pa.binary(16)),  #sorted, looked up with searchsorted
+    ("name", pa.string()),
+    ("description", pa.string()),
+    ("price", pa.float64()),
+    ("stock", pa.int64()),
+    ("category", pa.string()),
+    ("image_url", pa.string()),
+    ("image_key", pa.string()),
+])
+COLUMNS = [field.name for field in SCHEMA]
+
+POINTER_FILE = "CURRENT"
+LOCK_FILE = "publish.lock"
+#older files are kept around for workers still mapping them
+KEEP_FILES = 3
+
+
+class CatalogSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        #wall clock, the file may have been published by another worker
+        self.published_at = os.path.getmtime(path)
+        self.table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        ids = self.table.column("id")
+        if ids.num_chunks == 0 or len(ids) == 0:
+            self.ids = np.empty(0, dtype="S16")
+        else:
+            chunk = ids.chunk(0)
+            #zero-copy view over the mapped id column
+            self.ids = np.frombuffer(chunk.buffers()[1], dtype="S16", count=len(chunk), offset=chunk.offset * 16)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def age(self) -> float:
+        return time.time() - self.published_at
+
+    def get_many(self, product_ids: Iterable[UUID]) -> Dict[UUID, dict]:
+        product_ids = list(product_ids)
+        if not product_ids or not len(self.ids):
+            return {}
+        keys = np.array([product_id.bytes for product_id in product_ids], dtype="S16")
+        positions = np.minimum(np.searchsorted(self.ids, keys), len(self.ids) - 1)
+        hits = np.nonzero(self.ids[positions] == keys)[0]
+        if not len(hits):
+            return {}
+        rows = self.table.take(pa.array(positions[hits])).to_pylist()
+        found = {}
+        for row in rows:
+            row["id"] = UUID(bytes=row["id"])
+            found[row["id"]] = row
+        return found
+
+
+#swaps to a new snapshot when the pointer file changes, checked at most once per interval
+class SnapshotReader:
+    def __init__(self, directory: str, check_interval: float):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[CatalogSnapshot]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._checked_at = now
+                self._refresh()
+            finally:
+                self._lock.release()
+        return self._snapshot
+
+    def _refresh(self):
+        try:
+            with open(os.path.join(self.directory, POINTER_FILE)) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return
+        path = os.path.join(self.directory, name)
+        if self._snapshot is not None and self._snapshot.path == path:
+            return
+        try:
+            snapshot = CatalogSnapshot(path)
+        except Exception as e:
+            logger.warning("Could not map catalog snapshot %s: %s", path, str(e))
+            return
+        #readers holding the old one keep using it until they drop the reference
+        self._snapshot = snapshot
+        logger.info("Mapped catalog snapshot %s (%d products)", name, len(snapshot))
+
+
+#rebuilds the snapshot from the primary, debounced so bursts of writes publish once;
+#also republishes on a timer so writes made on other hosts show up
+class SnapshotPublisher:
+    def __init__(self, directory: str, debounce: float, republish_interval: float):
+        self.directory = directory
+        self.debounce = debounce
+        self.republish_interval = republish_interval
+        self._requested = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="catalog-publisher", daemon=True)
+                    self._thread.start()
+
+    def request(self):
+        self.start()
+        self._requested.set()
+
+    #used at startup, a snapshot left over from before a restart may be far behind
+    def publish_if_stale(self, max_age: float):
+        try:
+            age = time.time() - os.path.getmtime(os.path.join(self.directory, POINTER_FILE))
+        except FileNotFoundError:
+            age = None
+        if age is None or age > max_age:
+            self.publish()
+
+    def publish(self) -> bool:
+        os.makedirs(self.directory, exist_ok=True)
+        with _exclusive(os.path.join(self.directory, LOCK_FILE)) as acquired:
+            if not acquired:
+                return False
+            started = time.monotonic()
+            db = SessionLocal()
+            try:
+                rows = db.query(*[getattr(Product, column) for column in COLUMNS]).all()
+            finally:
+                db.close()
+
+            rows.sort(key=lambda row: row.id.bytes)
+            batch = pa.record_batch([
+                pa.array([row.id.bytes for row in rows], type=pa.binary(16)),
+                pa.array([row.name for row in rows], type=pa.string()),
+                pa.array([row.description for row in rows], type=pa.string()),
+                pa.array([row.price for row in rows], type=pa.float64()),
+                pa.array([row.stock for row in rows], type=pa.int64()),
+                pa.array([row.category for row in rows], type=pa.string()),
+                pa.array([row.image_url for row in rows], type=pa.string()),
+                pa.array([row.image_key for row in rows], type=pa.string()),
+            ], schema=SCHEMA)
+
+            name = f"catalog-{time.time_ns()}-{os.getpid()}.arrow"
+            _write_atomic(os.path.join(self.directory, name), lambda sink: _write_batch(sink, batch))
+            _write_atomic(os.path.join(self.directory, POINTER_FILE), lambda sink: sink.write(name.encode()))
+            self._cleanup(keep=name)
+            logger.info("Published catalog snapshot %s (%d products) in %.2fs",
+                        name, len(rows), time.monotonic() - started)
+            return True
+
+    def _run(self):
+        while True:
+            if not self._requested.wait(self.republish_interval):
+                #timer tick, whichever worker on the host gets here first republishes
+                try:
+                    self.publish_if_stale(self.republish_interval)
+                except Exception as e:
+                    logger.exception("Catalog snapshot republish failed: %s", str(e))
+                continue
+            time.sleep(self.debounce)
+            self._requested.clear()
+            try:
+                if not self.publish():
+                    #another worker is publishing, its read may predate our write
+                    self._requested.set()
+            except Exception as e:
+                logger.exception("Catalog snapshot publish failed: %s", str(e))
+
+    def _cleanup(self, keep: str):
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith("catalog-") and name.endswith(".arrow"))
+        for name in names[:-KEEP_FILES]:
+            if name != keep:
+                #unlinking is safe on posix, existing mappings stay valid
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+def _write_batch(sink, batch: pa.RecordBatch):
+    with pa.ipc.new_file(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+
+
+def _write_atomic(path: str, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as sink:
+        write(sink)
+        sink.flush()
+        os.fsync(sink.fileno())
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _exclusive(path: str):
+    if fcntl is None:
+        yield True
+        return
+    with open(path, "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+reader = SnapshotReader(settings.CATALOG_SNAPSHOT_DIR, settings.CATALOG_SNAPSHOT_CHECK_SECONDS)
+publisher = SnapshotPublisher(settings.CATALOG_SNAPSHOT_DIR, settings.CATALOG_SNAPSHOT_DEBOUNCE_SECONDS,
+                              settings.CATALOG_SNAPSHOT_REPUBLISH_SECONDS)
+
+
+#empty when snapshots are disabled, none has been published yet, or the current
+#one is older than CATALOG_SNAPSHOT_MAX_AGE_SECONDS (callers fall back to the db)
+def get_many(product_ids: List[UUID]) -> Dict[UUID, dict]:
+    if not settings.CATALOG_SNAPSHOT_ENABLED:
+        return {}
+    snapshot = reader.current()
+    if snapshot is None:
+        return {}
+    if snapshot.age() > settings.CATALOG_SNAPSHOT_MAX_AGE_SECONDS:
+        logger.debug("Catalog snapshot is %.0fs old, skipping it", snapshot.age())
+        return {}
+    return snapshot.get_many(product_ids)
+
+
+def request_publish():
+    if settings.CATALOG_SNAPSHOT_ENABLED:
+        publisher.request()
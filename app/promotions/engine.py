@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+from app.promotions.models import Promotion, PromotionKind
+
+logger = setup_logger(__name__)
+
+
+#one cart line going into the engine
+@dataclass
+class CartLine:
+    product_id: UUID
+    category: Optional[str]
+    quantity: int
+    unit_price: float
+
+
+#plain copy of a promotion row, safe to share between request threads
+@dataclass(frozen=True)
+class Rule:
+    id: UUID
+    name: str
+    kind: PromotionKind
+    percent: Optional[float]
+    buy_quantity: Optional[int]
+    get_quantity: Optional[int]
+    tiers: Tuple[Tuple[int, float], ...]  #(min_quantity, percent), highest first
+    starts_at: Optional[datetime]
+    ends_at: Optional[datetime]
+
+    def live(self, now: datetime) -> bool:
+        return (self.starts_at is None or self.starts_at <= now) and (self.ends_at is None or now < self.ends_at)
+
+
+#active rules indexed by what they target, built once per promotion change
+class CompiledRules:
+    def __init__(self, rules: List[Tuple[Rule, Optional[UUID], Optional[str]]]):
+        self.by_product: Dict[UUID, List[Rule]] = defaultdict(list)
+        self.by_category: Dict[str, List[Rule]] = defaultdict(list)
+        self.sitewide: List[Rule] = []
+        for rule, product_id, category in rules:
+            if product_id is not None:
+                self.by_product[product_id].append(rule)
+            elif category is not None:
+                self.by_category[category].append(rule)
+            else:
+                self.sitewide.append(rule)
+        self.count = len(rules)
+
+    def matching(self, line: CartLine) -> List[Rule]:
+        rules = self.by_product.get(line.product_id, [])
+        if line.category is not None:
+            rules = rules + self.by_category.get(line.category, [])
+        return rules + self.sitewide if self.sitewide else rules
+
+
+#prices a whole cart against the compiled rules, lines don't stack promotions,
+#each gets the single best discount it qualifies for
+def evaluate(compiled: CompiledRules, lines: List[CartLine], now: datetime) -> List[Tuple[float, Optional[Rule]]]:
+    candidates = []
+    #tiered rules count units across every line they match, e.g. 3 shirts of any kind
+    units_per_rule: Dict[UUID, int] = defaultdict(int)
+    for line in lines:
+        rules = [rule for rule in compiled.matching(line) if rule.live(now)]
+        for rule in rules:
+            units_per_rule[rule.id] += line.quantity
+        candidates.append(rules)
+
+    results = []
+    for line, rules in zip(lines, candidates):
+        best, best_rule = 0.0, None
+        for rule in rules:
+            discount = _discount(rule, line, units_per_rule[rule.id])
+            if discount > best:
+                best, best_rule = discount, rule
+        results.append((round(best, 2), best_rule))
+    return results
+
+
+def _discount(rule: Rule, line: CartLine, rule_units: int) -> float:
+    subtotal = line.quantity * line.unit_price
+    if rule.kind == PromotionKind.percentage:
+        return subtotal * rule.percent / 100
+    if rule.kind == PromotionKind.bogo:
+        free = (line.quantity // (rule.buy_quantity + rule.get_quantity)) * rule.get_quantity
+        return free * line.unit_price
+    if rule.kind == PromotionKind.tiered:
+        for min_quantity, percent in rule.tiers:
+            if rule_units >= min_quantity:
+                return subtotal * percent / 100
+    return 0.0
+
+
+#per-worker cache of the compiled rules, the table is only re-read when a cheap
+#count/max(updated_at) check says promotions changed, at most once per interval
+class PromotionEngine:
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._compiled = CompiledRules([])
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self, db: Session) -> CompiledRules:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            with self._lock:
+                if now - self._checked_at >= self.check_interval:
+                    self.refresh(db)
+                    self._checked_at = now
+        return self._compiled
+
+    def refresh(self, db: Session):
+        version = tuple(db.query(func.count(Promotion.id), func.max(Promotion.updated_at)).one())
+        if version == self._version:
+            return
+        self._compiled = self._compile(db)
+        self._version = version
+        logger.info("Compiled %d active promotions", self._compiled.count)
+
+    #forces a recompile on the next lookup, used after admin writes in this worker
+    def invalidate(self):
+        self._version = None
+        self._checked_at = 0.0
+
+    def price_cart(self, db: Session, lines: List[CartLine]) -> dict:
+        results = evaluate(self.current(db), lines, _utcnow())
+        priced = []
+        for line, (discount, rule) in zip(lines, results):
+            subtotal = round(line.quantity * line.unit_price, 2)
+            priced.append({
+                "product_id": line.product_id,
+                "quantity": line.quantity,
+                "unit_price": line.unit_price,
+                "subtotal": subtotal,
+                "discount": discount,
+                "total": round(subtotal - discount, 2),
+                "promotion_id": rule.id if rule else None,
+                "promotion_name": rule.name if rule else None,
+            })
+        subtotal = round(sum(line["subtotal"] for line in priced), 2)
+        discount = round(sum(line["discount"] for line in priced), 2)
+        return {"lines": priced, "subtotal": subtotal, "discount": discount, "total": round(subtotal - discount, 2)}
+
+    def _compile(self, db: Session) -> CompiledRules:
+        #rules that start later are kept, the version doesn't move when they go live
+        rows = (
+            db.query(Promotion)
+            .filter(Promotion.active.is_(True))
+            .filter((Promotion.ends_at.is_(None)) | (Promotion.ends_at > _utcnow()))
+            .all()
+        )
+        rules = []
+        for row in rows:
+            tiers = sorted(((tier["min_quantity"], tier["percent"]) for tier in row.tiers or []), reverse=True)
+            rule = Rule(
+                id=row.id,
+                name=row.name,
+                kind=PromotionKind(row.kind),
+                percent=row.percent,
+                buy_quantity=row.buy_quantity,
+                get_quantity=row.get_quantity,
+                tiers=tuple(tiers),
+                starts_at=_naive(row.starts_at),
+                ends_at=_naive(row.ends_at),
+            )
+            rules.append((rule, row.product_id, row.category))
+        return CompiledRules(rules)
+
+
+#timestamps are stored as naive utc
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+engine = PromotionEngine(settings.PROMOTIONS_CHECK_SECONDS)
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, JSON, ForeignKey, Uuid
+from app.core.database import Base
+import uuid
+import enum
+from datetime import datetime, timezone
+
+
+class PromotionKind(str, enum.Enum):
+    percentage = "percentage"  #percent off every matching unit
+    bogo = "bogo"              #buy buy_quantity, get get_quantity free, per product
+    tiered = "tiered"          #percent off once enough matching units are in the cart
+
+
+#targets one product, one category or (neither set) the whole catalog
+class Promotion(Base):
+    __tablename__ = "promotions"
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    name = Column(String, nullable=False)
+    kind = Column(String, nullable=False)
+    product_id = Column(Uuid, ForeignKey("products.id", ondelete="CASCADE"), nullable=True, index=True)
+    category = Column(String, nullable=True, index=True)
+    percent = Column(Float, nullable=True)
+    buy_quantity = Column(Integer, nullable=True)
+    get_quantity = Column(Integer, nullable=True)
+    #[{"min_quantity": 3, "percent": 10}, ...]
+    tiers = Column(JSON, nullable=True)
+    starts_at = Column(DateTime, nullable=True)
+    ends_at = Column(DateTime, nullable=True)
+    active = Column(Boolean, default=True, nullable=False)
+    #bumped on every change, the engine recompiles when max(updated_at) moves
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc), nullable=False, index=True)
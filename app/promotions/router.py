@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from uuid import UUID
+
+from app.core.database import get_db, get_read_db, record_write
+from app.auth.dependencies import admin_required
+from app.promotions import models, schemas
+from app.promotions.engine import engine
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+router = APIRouter(
+    prefix="/admin/promotions",
+    tags=["admin-promotions"],
+    dependencies=[Depends(admin_required), Depends(record_write)],
+)
+
+
+@router.get("/", response_model=List[schemas.PromotionResponse])
+def list_promotions(db: Session = Depends(get_read_db)):
+    try:
+        promotions = db.query(models.Promotion).order_by(models.Promotion.updated_at.desc()).all()
+        logger.info("Fetched %d promotions", len(promotions))
+        return promotions
+    except Exception as e:
+        logger.exception("Error while listing promotions: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/", response_model=schemas.PromotionResponse, status_code=status.HTTP_201_CREATED)
+def create_promotion(promotion_in: schemas.PromotionCreate, db: Session = Depends(get_db)):
+    try:
+        logger.debug("Creating promotion: %s", promotion_in.name)
+        promotion = models.Promotion(**_row_values(promotion_in))
+        db.add(promotion)
+        db.commit()
+        db.refresh(promotion)
+        engine.invalidate()
+        logger.info("Promotion created: %s", promotion.id)
+        return promotion
+    except Exception as e:
+        logger.exception("Error while creating promotion: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.put("/{promotion_id}", response_model=schemas.PromotionResponse)
+def update_promotion(promotion_id: UUID, promotion_in: schemas.PromotionCreate, db: Session = Depends(get_db)):
+    try:
+        promotion = db.query(models.Promotion).filter(models.Promotion.id == promotion_id).first()
+        if not promotion:
+            logger.warning("Promotion not found: %s", promotion_id)
+            raise HTTPException(status_code=404, detail="Promotion not found")
+
+        for field, value in _row_values(promotion_in).items():
+            setattr(promotion, field, value)
+        db.commit()
+        db.refresh(promotion)
+        engine.invalidate()
+        logger.info("Promotion updated: %s", promotion_id)
+        return promotion
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while updating promotion %s: %s", promotion_id, str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.delete("/{promotion_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_promotion(promotion_id: UUID, db: Session = Depends(get_db)):
+    try:
+        promotion = db.query(models.Promotion).filter(models.Promotion.id == promotion_id).first()
+        if not promotion:
+            logger.warning("Promotion not found: %s", promotion_id)
+            raise HTTPException(status_code=404, detail="Promotion not found")
+
+        db.delete(promotion)
+        db.commit()
+        engine.invalidate()
+        logger.info("Promotion deleted: %s", promotion_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error while deleting promotion %s: %s", promotion_id, str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+def _row_values(promotion_in: schemas.PromotionCreate) -> dict:
+    values = promotion_in.model_dump()
+    values["kind"] = promotion_in.kind.value
+    return values
@@ -0,0 +1,95 @@
+from pydantic import BaseModel, Field, field_validator, model_validator
+from uuid import UUID
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.promotions.models import PromotionKind
+
+
+class PromotionTier(BaseModel):
+    min_quantity: int = Field(..., ge=1)
+    percent: float = Field(..., gt=0, le=100)
+
+
+class PromotionBase(BaseModel):
+    name: str = Field(..., min_length=1)
+    kind: PromotionKind
+    product_id: Optional[UUID] = None
+    category: Optional[str] = None
+    percent: Optional[float] = Field(None, gt=0, le=100)
+    buy_quantity: Optional[int] = Field(None, ge=1)
+    get_quantity: Optional[int] = Field(None, ge=1)
+    tiers: Optional[List[PromotionTier]] = None
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    active: bool = True
+
+    #columns are naive utc, an offset in the request is converted rather than dropped
+    @field_validator("starts_at", "ends_at")
+    def to_naive_utc(cls, value):
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    #each kind needs its own parameters
+    @model_validator(mode="after")
+    def check_rule(self):
+        if self.product_id is not None and self.category is not None:
+            raise ValueError("target a product or a category, not both")
+        if self.kind == PromotionKind.percentage and self.percent is None:
+            raise ValueError("percentage promotions need percent")
+        if self.kind == PromotionKind.bogo and (self.buy_quantity is None or self.get_quantity is None):
+            raise ValueError("bogo promotions need buy_quantity and get_quantity")
+        if self.kind == PromotionKind.tiered and not self.tiers:
+            raise ValueError("tiered promotions need tiers")
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValueError("ends_at must be after starts_at")
+        return self
+
+
+#parameters each kind reads, anything else would be silently ignored by the engine
+KIND_PARAMETERS = {
+    PromotionKind.percentage: {"percent"},
+    PromotionKind.bogo: {"buy_quantity", "get_quantity"},
+    PromotionKind.tiered: {"tiers"},
+}
+
+
+class PromotionCreate(PromotionBase):
+    #only on input, rows stored before this check still have to serialize
+    @model_validator(mode="after")
+    def reject_other_parameters(self):
+        allowed = KIND_PARAMETERS[self.kind]
+        extra = sorted(
+            field for field in ("percent", "buy_quantity", "get_quantity", "tiers")
+            if field not in allowed and getattr(self, field) is not None
+        )
+        if extra:
+            raise ValueError(f"{self.kind.value} promotions don't take {', '.join(extra)}")
+        return self
+
+
+class PromotionResponse(PromotionBase):
+    id: UUID
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CartPreviewLine(BaseModel):
+    product_id: UUID
+    quantity: int
+    unit_price: float
+    subtotal: float
+    discount: float
+    total: float
+    promotion_id: Optional[UUID] = None
+    promotion_name: Optional[str] = None
+
+
+class CartPreview(BaseModel):
+    lines: List[CartPreviewLine]
+    subtotal: float
+    discount: float
+    total: float
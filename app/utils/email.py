@@ -6,6 +6,9 @@ from app.core.config import settings
 #SMTP setup
 
 def send_reset_email(to_email: str, reset_token: str):
+    if not settings.SMTP_HOST or not settings.SMTP_USER:
+        raise RuntimeError("SMTP is not configured")
+
     msg = MIMEMultipart()
     msg["From"] = settings.SMTP_USER
     msg["To"] = to_email
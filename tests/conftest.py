@@ -0,0 +1,108 @@
+import os
+
+#settings are read at import time, so these have to be in place before app.* is imported
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+#nothing that writes to disk or runs in background threads
+os.environ.setdefault("CATALOG_SNAPSHOT_ENABLED", "false")
+os.environ.setdefault("REVOCATION_REFRESH_SECONDS", "0")
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.auth import utils
+from app.auth.models import User, UserRole
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, ReadSessionLocal, engine, get_db, get_read_db
+from app.main import create_app
+from app.products import autocomplete, cache, recommendations
+from app.products.models import Product
+from app.promotions.engine import engine as promotion_engine
+
+#hashed once, bcrypt is deliberately slow
+PASSWORD = "Password1!"
+PASSWORD_HASH = utils.hash_password(PASSWORD)
+
+
+#schema is built once, every test runs inside a transaction that is rolled back
+@pytest.fixture(scope="session")
+def app():
+    Base.metadata.create_all(bind=engine)
+    #no lifespan, warmup and background workers stay off
+    yield create_app()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db(app):
+    connection = engine.connect()
+    transaction = connection.begin()
+    #commits inside the app only release a savepoint
+    SessionLocal.configure(bind=connection, join_transaction_mode="create_savepoint")
+    ReadSessionLocal.configure(bind=connection, join_transaction_mode="create_savepoint")
+    session = Session(bind=connection, join_transaction_mode="create_savepoint", autoflush=False)
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+        SessionLocal.configure(bind=engine, join_transaction_mode="conservative_savepoint")
+        ReadSessionLocal.configure(bind=engine, join_transaction_mode="conservative_savepoint")
+        #per-worker caches and indexes would otherwise leak rows from the rolled back transaction
+        cache.invalidate()
+        promotion_engine.invalidate()
+        autocomplete.index = autocomplete.PrefixIndex()
+        recommendations.index = recommendations.CoPurchaseIndex(settings.RECOMMENDATIONS_TOP_K)
+
+
+@pytest.fixture
+def client(app, db):
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_read_db] = lambda: db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def _make_user(db: Session, role: UserRole, email: str) -> User:
+    user = User(name=role.value, email=email, role=role, password=PASSWORD_HASH)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _auth_headers(user: User) -> dict:
+    token = utils.create_access_token(data={"sub": str(user.id), "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def user(db):
+    return _make_user(db, UserRole.user, "user@example.com")
+
+
+@pytest.fixture
+def admin(db):
+    return _make_user(db, UserRole.admin, "admin@example.com")
+
+
+@pytest.fixture
+def user_headers(user):
+    return _auth_headers(user)
+
+
+@pytest.fixture
+def admin_headers(admin):
+    return _auth_headers(admin)
+
+
+@pytest.fixture
+def product(db):
+    product = Product(name="Desk Lamp", description="LED lamp", price=25.0, stock=10, category="home")
+    db.add(product)
+    db.commit()
+    return product
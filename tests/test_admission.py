@@ -0,0 +1,151 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from app.core.admission import AdmissionGate, AdmissionMiddleware
+from app.core.config import settings
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+#lets queued acquire() tasks reach their wait
+async def _settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_admits_up_to_the_limit_then_queues():
+    async def scenario():
+        gate = AdmissionGate("catalog", limit=2, queue_size=2, timeout=5)
+        assert await gate.acquire()
+        assert await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire())
+        await _settle()
+        assert not waiter.done()
+        assert gate.stats() == {"limit": 2, "active": 2, "queued": 1, "rejected": 0}
+
+        gate.release()
+        assert await waiter is True
+        #the slot was handed over, not freed and retaken
+        assert gate.active == 2
+        assert gate.queued == 0
+    _run(scenario())
+
+
+def test_rejects_at_once_when_the_queue_is_full():
+    async def scenario():
+        gate = AdmissionGate("catalog", limit=1, queue_size=1, timeout=5)
+        assert await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire())
+        await _settle()
+
+        assert await gate.acquire() is False
+        assert gate.rejected == 1
+        assert gate.queued == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+    _run(scenario())
+
+
+def test_queued_waiter_times_out():
+    async def scenario():
+        gate = AdmissionGate("catalog", limit=1, queue_size=1, timeout=0.05)
+        assert await gate.acquire()
+        assert await gate.acquire() is False
+        assert gate.rejected == 1
+        assert gate.queued == 0
+
+        #nobody left to hand the slot to
+        gate.release()
+        assert gate.active == 0
+    _run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue_and_the_next_one_gets_the_slot():
+    async def scenario():
+        gate = AdmissionGate("catalog", limit=1, queue_size=2, timeout=5)
+        assert await gate.acquire()
+        first = asyncio.create_task(gate.acquire())
+        second = asyncio.create_task(gate.acquire())
+        await _settle()
+        assert gate.queued == 2
+
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        assert first.cancelled()
+        assert gate.queued == 1
+
+        gate.release()
+        assert await second is True
+        assert gate.active == 1
+        gate.release()
+        assert gate.active == 0
+    _run(scenario())
+
+
+def test_waiter_cancelled_after_a_handover_gives_the_slot_back():
+    async def scenario():
+        gate = AdmissionGate("catalog", limit=1, queue_size=1, timeout=5)
+        assert await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire())
+        await _settle()
+
+        #handed over, then cancelled before the waiter ever runs again
+        gate.release()
+        waiter.cancel()
+        outcome, = await asyncio.gather(waiter, return_exceptions=True)
+        #some pythons' wait_for keeps a result that landed first, then the caller owns the slot
+        if outcome is True:
+            gate.release()
+        assert gate.active == 0
+        assert gate.queued == 0
+    _run(scenario())
+
+
+def test_slots_pass_to_waiters_in_arrival_order():
+    async def scenario():
+        gate = AdmissionGate("catalog", limit=1, queue_size=3, timeout=5)
+        assert await gate.acquire()
+        admitted = []
+
+        async def wait(n):
+            if await gate.acquire():
+                admitted.append(n)
+
+        waiters = [asyncio.create_task(wait(n)) for n in range(3)]
+        await _settle()
+        for _ in range(3):
+            gate.release()
+            await _settle()
+        await asyncio.gather(*waiters)
+        assert admitted == [0, 1, 2]
+        gate.release()
+        assert gate.active == 0
+    _run(scenario())
+
+
+async def _ok(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def test_middleware_sheds_with_503_and_retry_after(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(settings, "ADMISSION_RETRY_AFTER_SECONDS", 7)
+    gate = AdmissionGate("catalog", limit=1, queue_size=0, timeout=5)
+    client = TestClient(AdmissionMiddleware(_ok, {"catalog": gate}))
+
+    assert client.get("/products/").status_code == 200
+    assert gate.active == 0
+
+    gate.active = 1
+    response = client.get("/products/")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert response.json()["code"] == 503
+    assert gate.rejected == 1
+
+    #bypassed paths are never shed
+    assert client.get("/health/live").status_code == 200
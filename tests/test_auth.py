@@ -0,0 +1,50 @@
+from app.cart import guest
+from app.cart.models import CartItem
+from tests.conftest import PASSWORD
+
+
+def _signin(client, email, password=PASSWORD, headers=None):
+    return client.post("/auth/signin", data={"username": email, "password": password}, headers=headers or {})
+
+
+def test_signup_then_signin(client):
+    response = client.post("/auth/signup", json={
+        "name": "Ada", "email": "ada@example.com", "role": "user", "password": PASSWORD,
+    })
+    assert response.status_code == 200
+    assert response.json()["email"] == "ada@example.com"
+
+    response = _signin(client, "ada@example.com")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["token_type"] == "bearer"
+    assert body["access_token"] and body["refresh_token"]
+
+
+def test_signin_rejects_wrong_password(client, user):
+    assert _signin(client, user.email, "Wrong-password1").status_code == 401
+
+
+def test_signin_rejects_unknown_email(client):
+    assert _signin(client, "nobody@example.com").status_code == 401
+
+
+def test_logout_revokes_the_token(client, user):
+    token = _signin(client, user.email).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/cart/", headers=headers).status_code == 200
+
+    assert client.post("/auth/logout", headers=headers).status_code == 204
+    assert client.get("/cart/", headers=headers).status_code == 401
+
+
+def test_signin_merges_guest_cart_once(client, db, user, product):
+    headers = {"X-Guest-Cart": guest.encode_guest_cart({product.id: 3})}
+    #replaying the same token must not add the quantity again
+    for _ in range(2):
+        assert _signin(client, user.email, headers=headers).status_code == 200
+    assert db.query(CartItem).filter_by(user_id=user.id).one().quantity == 3
+
+
+def test_signin_ignores_invalid_guest_cart(client, user):
+    assert _signin(client, user.email, headers={"X-Guest-Cart": "garbage"}).status_code == 200
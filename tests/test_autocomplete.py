@@ -0,0 +1,63 @@
+from uuid import uuid4
+
+from app.products.autocomplete import PrefixIndex
+
+
+#runs the real query, then writes to the index before the build gets the rows,
+#i.e. an admin edit or a checkout landing between the rebuild's read and its swap
+class _AfterRead:
+    def __init__(self, query, on_read):
+        self.query = query
+        self.on_read = on_read
+
+    def all(self):
+        rows = self.query.all()
+        self.on_read()
+        return rows
+
+
+def _texts(suggestions):
+    return [suggestion["text"] for suggestion in suggestions]
+
+
+def test_writes_during_rebuild_survive_the_swap(db, product, monkeypatch):
+    index = PrefixIndex()
+    index.build(db)
+    desk = uuid4()
+    real_query = db.query
+
+    def write():
+        index.upsert_product(desk, "Walnut desk", "furniture")
+        index.record_sales([(product.id, 4)])
+
+    def query(*entities):
+        monkeypatch.setattr(db, "query", real_query)
+        return _AfterRead(real_query(*entities), write)
+
+    monkeypatch.setattr(db, "query", query)
+    index.build(db)
+    assert _texts(index.complete("walnut", 5)) == ["Walnut desk"]
+    assert index.complete("walnut", 5)[0]["product_id"] == str(desk)
+    assert index._popularity[str(product.id)] == 4
+
+
+def test_sale_drops_only_the_prefixes_it_can_change():
+    index = PrefixIndex()
+    lamp, fan, chair = uuid4(), uuid4(), uuid4()
+    index.upsert_product(lamp, "Desk lamp", "lighting")
+    index.upsert_product(fan, "Desk fan", "cooling")
+    index.upsert_product(chair, "Oak chair", "furniture")
+    index.complete("desk", 5)
+    index.complete("fu", 5)
+    index.complete("oak", 5)
+
+    index.record_sales([(fan, 3)])
+    assert "desk" not in index._memo
+    assert "fu" in index._memo and "oak" in index._memo
+    #the dropped prefix is answered again with the new popularity
+    assert _texts(index.complete("desk", 5)) == ["Desk fan", "Desk lamp"]
+    assert _texts(index.complete("coo", 5)) == ["cooling"]
+
+    #catalog changes still drop everything
+    index.upsert_product(chair, "Oak stool", "furniture")
+    assert index._memo == {}
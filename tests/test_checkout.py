@@ -0,0 +1,72 @@
+from app.analytics.models import DailyProductSales
+from app.cart.models import CartItem
+from app.orders.models import Order
+
+
+def _add(client, headers, product, quantity):
+    return client.post("/cart/", headers=headers, json={"product_id": str(product.id), "quantity": quantity})
+
+
+def test_cart_add_view_update_remove(client, user_headers, product):
+    assert _add(client, user_headers, product, 2).status_code == 200
+    assert _add(client, user_headers, product, 1).status_code == 200
+    items = client.get("/cart/", headers=user_headers).json()
+    assert [item["quantity"] for item in items] == [3]
+
+    response = client.put(f"/cart/{product.id}", headers=user_headers, json={"quantity": 5})
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 5
+
+    assert client.delete(f"/cart/{product.id}", headers=user_headers).status_code == 204
+    assert client.get("/cart/", headers=user_headers).json() == []
+
+
+def test_cart_rejects_more_than_stock(client, user_headers, product):
+    assert _add(client, user_headers, product, product.stock + 1).status_code != 200
+
+
+def test_checkout_places_order_and_deducts_stock(client, db, user, user_headers, product):
+    _add(client, user_headers, product, 4)
+    response = client.post("/checkout/", headers=user_headers)
+    assert response.status_code == 201
+    body = response.json()
+    assert body["total"] == 100.0
+
+    db.expire_all()
+    assert product.stock == 6
+    assert db.query(CartItem).filter_by(user_id=user.id).count() == 0
+    order = db.query(Order).filter_by(user_id=user.id).one()
+    assert order.total_amount == 100.0
+    assert db.query(DailyProductSales).one().revenue == 100.0
+
+
+def test_checkout_with_empty_cart(client, user_headers):
+    assert client.post("/checkout/", headers=user_headers).status_code == 400
+
+
+def test_checkout_applies_promotions_to_total_and_revenue(client, db, admin_headers, user_headers, product):
+    response = client.post("/admin/promotions/", headers=admin_headers, json={
+        "name": "Lamp week", "kind": "percentage", "percent": 20, "product_id": str(product.id),
+    })
+    assert response.status_code == 201
+    _add(client, user_headers, product, 2)
+
+    preview = client.get("/cart/preview", headers=user_headers).json()
+    assert preview["discount"] == 10.0
+
+    body = client.post("/checkout/", headers=user_headers).json()
+    assert body["discount"] == 10.0
+    assert body["total"] == 40.0
+    assert db.query(DailyProductSales).one().revenue == 40.0
+
+
+def test_checkout_requires_auth(client):
+    assert client.post("/checkout/").status_code == 401
+
+
+def test_promotion_rejects_parameters_of_another_kind(client, admin_headers):
+    response = client.post("/admin/promotions/", headers=admin_headers, json={
+        "name": "Lamp week", "kind": "percentage", "percent": 20, "buy_quantity": 2,
+    })
+    assert response.status_code == 422
+    assert client.get("/admin/promotions/", headers=admin_headers).json() == []
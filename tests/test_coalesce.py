@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.database import READ_PRIMARY_COOKIE
+from app.products.coalesce import CoalescedError, SingleFlight, flights
+
+
+def _run_concurrently(flight, count, fn, key="k"):
+    results, errors = [None] * count, [None] * count
+
+    def call(n):
+        try:
+            results[n] = flight.do("group", key, fn)
+        except Exception as e:
+            errors[n] = e
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+#the leader blocks on an event until every follower is waiting on it
+def _blocking(release: threading.Event, calls: list, outcome):
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return fn
+
+
+def _wait_for_followers(flight, count):
+    deadline = time.monotonic() + 5
+    while flight.stats().get("group", {}).get("coalesced", 0) < count:
+        assert time.monotonic() < deadline, "followers never joined"
+        time.sleep(0.001)
+
+
+def test_followers_share_the_leaders_result():
+    flight, release, calls = SingleFlight(wait_timeout=5), threading.Event(), []
+    threads, results, errors = _run_concurrently(flight, 5, _blocking(release, calls, b"body"))
+    _wait_for_followers(flight, 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [b"body"] * 5
+    assert errors == [None] * 5
+    assert flight.stats()["group"] == {"executed": 1, "coalesced": 4, "errors": 0, "timeouts": 0, "in_flight": 0}
+
+
+def test_leader_errors_reach_every_waiter_as_their_own_exception():
+    flight, release, calls = SingleFlight(wait_timeout=5), threading.Event(), []
+    failure = RuntimeError("database went away")
+    threads, results, errors = _run_concurrently(flight, 3, _blocking(release, calls, failure))
+    _wait_for_followers(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert errors.count(failure) == 1
+    followers = [error for error in errors if error is not failure]
+    assert len(followers) == 2
+    #each waiter gets its own exception, chained to the leader's
+    assert all(isinstance(error, CoalescedError) and error.__cause__ is failure for error in followers)
+    assert followers[0] is not followers[1]
+    assert flight.stats()["group"]["errors"] == 1
+
+
+def test_followers_run_their_own_call_after_the_timeout():
+    flight, release, calls = SingleFlight(wait_timeout=0.05), threading.Event(), []
+    stuck = _blocking(release, calls, b"late")
+    leader = threading.Thread(target=flight.do, args=("group", "k", stuck))
+    leader.start()
+    while not calls:
+        time.sleep(0.001)
+
+    assert flight.do("group", "k", lambda: b"own") == b"own"
+    release.set()
+    leader.join()
+    assert flight.stats()["group"]["timeouts"] == 1
+
+
+def test_distinct_keys_do_not_coalesce():
+    flight = SingleFlight(wait_timeout=5)
+    assert flight.do("group", "a", lambda: b"a") == b"a"
+    assert flight.do("group", "b", lambda: b"b") == b"b"
+    assert flight.stats()["group"]["executed"] == 2
+    assert flight.stats()["group"]["coalesced"] == 0
+
+
+@pytest.fixture
+def fresh_stats():
+    flights.reset_stats()
+    yield
+    flights.reset_stats()
+
+
+def test_list_products_goes_through_single_flight(client, product, fresh_stats):
+    assert client.get("/products/").status_code == 200
+    assert client.get("/products/search", params={"keyword": "lamp"}).status_code == 200
+    stats = flights.stats()
+    assert stats["list_products"]["executed"] == 1
+    assert stats["search_products"]["executed"] == 1
+
+
+def test_clients_that_just_wrote_bypass_coalescing(client, product, fresh_stats, monkeypatch):
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 5)
+    client.cookies.set(READ_PRIMARY_COOKIE, str(int(time.time()) + 5))
+    response = client.get("/products/")
+    assert response.status_code == 200
+    assert [entry["id"] for entry in response.json()] == [str(product.id)]
+    assert "list_products" not in flights.stats()
+
+
+def test_admin_stats_endpoints(client, admin_headers, product, fresh_stats):
+    client.get("/products/")
+    assert client.get("/admin/products/coalescing", headers=admin_headers).json()["list_products"]["executed"] == 1
+    assert client.delete("/admin/products/coalescing", headers=admin_headers).status_code == 204
+    assert client.get("/admin/products/coalescing", headers=admin_headers).json() == {}
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.orders import archive
+from app.orders.models import Order, OrderItem, OrderStatus
+
+
+def _place_order(client, headers, product, quantity=1):
+    client.post("/cart/", headers=headers, json={"product_id": str(product.id), "quantity": quantity})
+    return client.post("/checkout/", headers=headers).json()["order_id"]
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ORDER_ARCHIVE_ENABLED", True)
+    monkeypatch.setattr(settings, "ORDER_ARCHIVE_DIR", str(tmp_path))
+    return str(tmp_path)
+
+
+def test_order_history_and_detail(client, user_headers, product, archive_dir):
+    first = _place_order(client, user_headers, product, 1)
+    second = _place_order(client, user_headers, product, 2)
+
+    response = client.get("/orders/", headers=user_headers)
+    assert response.status_code == 200
+    assert {order["id"] for order in response.json()} == {first, second}
+
+    response = client.get(f"/orders/{second}", headers=user_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_amount"] == 50.0
+    assert [(item["quantity"], item["price"]) for item in body["items"]] == [(2, 25.0)]
+
+
+def test_order_detail_unknown_id(client, user_headers, archive_dir):
+    response = client.get("/orders/00000000-0000-0000-0000-000000000000", headers=user_headers)
+    assert response.status_code == 404
+
+
+def test_orders_are_private(client, db, user_headers, admin, product, archive_dir):
+    order = Order(user_id=admin.id, total_amount=25.0, status=OrderStatus.completed.value)
+    db.add(order)
+    db.commit()
+    assert client.get("/orders/", headers=user_headers).json() == []
+    assert client.get(f"/orders/{order.id}", headers=user_headers).status_code == 404
+
+
+def _archive_old_order(db, archive_dir, user, product) -> str:
+    created_at = datetime.utcnow() - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS + 1)
+    order = Order(user_id=user.id, total_amount=20.0, discount_amount=5.0,
+                  status=OrderStatus.completed.value, created_at=created_at)
+    order.items.append(OrderItem(product_id=product.id, quantity=1, price=25.0, discount=5.0))
+    db.add(order)
+    db.commit()
+    order_id = str(order.id)
+    assert archive.archive_batch(db, archive_dir, archive.archive_cutoff(), 100) == 1
+    assert db.query(Order).count() == 0
+    return order_id
+
+
+def test_archived_orders_stay_visible(client, db, user, user_headers, product, archive_dir):
+    order_id = _archive_old_order(db, archive_dir, user, product)
+
+    history = client.get("/orders/", headers=user_headers).json()
+    assert [entry["id"] for entry in history] == [order_id]
+    detail = client.get(f"/orders/{order_id}", headers=user_headers).json()
+    assert detail["total_amount"] == 20.0
+    assert [(item["product_id"], item["price"], item["discount"]) for item in detail["items"]] == [
+        (str(product.id), 25.0, 5.0),
+    ]
+
+
+def test_archive_is_only_read_for_users_with_archived_days(client, db, user, admin, product, archive_dir):
+    order_id = _archive_old_order(db, archive_dir, user, product)
+    assert archive.orders_for_user(db, admin.id, archive_dir) == []
+    assert archive.get_order(db, order_id, admin.id, archive_dir) is None
+
+
+def test_archive_is_ignored_when_disabled(client, db, user, user_headers, product, archive_dir, monkeypatch):
+    _archive_old_order(db, archive_dir, user, product)
+    monkeypatch.setattr(settings, "ORDER_ARCHIVE_ENABLED", False)
+    assert client.get("/orders/", headers=user_headers).json() == []
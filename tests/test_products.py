@@ -0,0 +1,76 @@
+import pytest
+
+from app.products.models import Product
+
+
+@pytest.fixture
+def catalog(db):
+    products = [
+        Product(name="Desk Lamp", description="LED lamp", price=25.0, stock=10, category="home"),
+        Product(name="Floor Lamp", description="Tall lamp", price=80.0, stock=3, category="home"),
+        Product(name="Notebook", description="Ruled paper", price=4.5, stock=100, category="office"),
+    ]
+    db.add_all(products)
+    db.commit()
+    return products
+
+
+def _names(response):
+    assert response.status_code == 200
+    return [product["name"] for product in response.json()]
+
+
+def test_list_products_filters_and_sorts(client, catalog):
+    assert _names(client.get("/products/", params={"category": "home", "sort_by": "price_desc"})) == [
+        "Floor Lamp", "Desk Lamp",
+    ]
+    assert _names(client.get("/products/", params={"min_price": 5, "max_price": 50})) == ["Desk Lamp"]
+
+
+def test_list_products_paginates(client, catalog):
+    first = _names(client.get("/products/", params={"sort_by": "name_asc", "page_size": 2}))
+    second = _names(client.get("/products/", params={"sort_by": "name_asc", "page_size": 2, "page": 2}))
+    assert first == ["Desk Lamp", "Floor Lamp"]
+    assert second == ["Notebook"]
+
+
+def test_search_matches_name_and_description_ignoring_case(client, catalog):
+    assert sorted(_names(client.get("/products/search", params={"keyword": "LAMP"}))) == ["Desk Lamp", "Floor Lamp"]
+    assert _names(client.get("/products/search", params={"keyword": "ruled"})) == ["Notebook"]
+    assert _names(client.get("/products/search", params={"keyword": "sofa"})) == []
+
+
+def test_get_product(client, product):
+    response = client.get(f"/products/{product.id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Desk Lamp"
+
+
+def test_get_missing_product(client, db):
+    assert client.get("/products/00000000-0000-0000-0000-000000000000").status_code == 404
+
+
+def test_bulk_patch_rejects_non_positive_price(client, admin_headers, product):
+    response = client.patch("/admin/products/bulk", headers=admin_headers, json={"items": [
+        {"id": str(product.id), "price_delta": -25.0},
+    ]})
+    assert response.status_code == 200
+    assert response.json()["rejected_ids"] == [str(product.id)]
+    assert client.get(f"/products/{product.id}").json()["price"] == 25.0
+
+
+def test_bulk_patch_rejects_negative_stock_and_applies_the_rest(client, admin_headers, catalog):
+    lamp, floor_lamp, notebook = catalog
+    response = client.patch("/admin/products/bulk", headers=admin_headers, json={"items": [
+        {"id": str(lamp.id), "stock_delta": -11},
+        {"id": str(floor_lamp.id), "stock_delta": -3, "price": 70.0},
+        {"id": str(notebook.id), "price_delta": 0.5},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["matched"] == 2
+    assert body["rejected_ids"] == [str(lamp.id)]
+    assert body["unmatched_ids"] == []
+    assert client.get(f"/products/{lamp.id}").json()["stock"] == 10
+    assert client.get(f"/products/{floor_lamp.id}").json()["stock"] == 0
+    assert client.get(f"/products/{notebook.id}").json()["price"] == 5.0
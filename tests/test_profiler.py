@@ -0,0 +1,60 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import profiler
+from app.core.config import settings
+
+
+def _profiled_only():
+    time.sleep(0.2)
+
+
+def _unprofiled_only():
+    time.sleep(0.2)
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/work")
+    def work(profiled: bool):
+        if profiled:
+            _profiled_only()
+        else:
+            _unprofiled_only()
+        return {}
+
+    app.add_middleware(profiler.ProfilingMiddleware)
+    profiler.instrument_routes(app)
+    return app
+
+
+def test_only_the_profiled_requests_thread_is_sampled(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_HEADER_TOKEN", "secret")
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_INTERVAL_MS", 2.0)
+    profiler._route_profiles.clear()
+    client = TestClient(_app())
+
+    #a concurrent request to the same route without the header
+    other = threading.Thread(target=client.get, args=("/work",), kwargs={"params": {"profiled": False}})
+    other.start()
+    response = client.get("/work", params={"profiled": True}, headers={"X-Profile": "secret"})
+    other.join()
+    assert response.status_code == 200
+
+    stacks = profiler._route_profiles["/work"]
+    assert sum(stacks.values()) > 0
+    assert any("_profiled_only" in stack for stack in stacks)
+    assert not any("_unprofiled_only" in stack for stack in stacks)
+    profiler._route_profiles.clear()
+
+
+def test_requests_without_the_token_are_not_profiled(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_HEADER_TOKEN", "secret")
+    profiler._route_profiles.clear()
+    client = TestClient(_app())
+    assert client.get("/work", params={"profiled": True}, headers={"X-Profile": "wrong"}).status_code == 200
+    assert profiler._route_profiles == {}
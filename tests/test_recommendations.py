@@ -0,0 +1,46 @@
+from uuid import uuid4
+
+from app.products.recommendations import CoPurchaseIndex
+
+
+#runs the real query, then records an order before the build gets the rows,
+#i.e. a checkout landing between the rebuild's read and its swap
+class _AfterRead:
+    def __init__(self, query, on_read):
+        self.query = query
+        self.on_read = on_read
+
+    def distinct(self):
+        self.query = self.query.distinct()
+        return self
+
+    def all(self):
+        rows = self.query.all()
+        self.on_read()
+        return rows
+
+
+def test_recorded_orders_show_up_in_related(db):
+    index = CoPurchaseIndex(top_k=3)
+    index.build(db)
+    lamp, bulb, shade = uuid4(), uuid4(), uuid4()
+    index.record_order([lamp, bulb])
+    index.record_order([lamp, bulb, shade])
+    assert index.related(lamp, 3) == [bulb, shade]
+    assert index.related(uuid4(), 3) == []
+
+
+def test_order_recorded_during_rebuild_survives_the_swap(db, monkeypatch):
+    index = CoPurchaseIndex(top_k=3)
+    index.build(db)
+    lamp, bulb = uuid4(), uuid4()
+    real_query = db.query
+
+    def query(*entities):
+        monkeypatch.setattr(db, "query", real_query)
+        return _AfterRead(real_query(*entities), lambda: index.record_order([lamp, bulb]))
+
+    monkeypatch.setattr(db, "query", query)
+    index.build(db)
+    assert index.related(lamp, 3) == [bulb]
+    assert index.related(bulb, 3) == [lamp]
@@ -0,0 +1,59 @@
+import threading
+from datetime import datetime, timedelta
+
+from app.auth.revocation import BloomFilter, RevocationList
+
+
+def _expires():
+    return datetime.utcnow() + timedelta(hours=1)
+
+
+#runs the real query, then calls on_read before rebuild() gets the rows,
+#i.e. a logout landing between the rebuild's read and its swap
+class _AfterRead:
+    def __init__(self, query, on_read):
+        self.query = query
+        self.on_read = on_read
+
+    def filter(self, *criteria):
+        self.query = self.query.filter(*criteria)
+        return self
+
+    def all(self):
+        rows = self.query.all()
+        self.on_read()
+        return rows
+
+
+def test_revoked_tokens_are_reported(db, user):
+    revocations = RevocationList(refresh_interval=0, rebuild_interval=3600)
+    revocations.revoke(db, [("jti-1", _expires(), user.id)])
+    assert revocations.is_revoked("jti-1")
+    assert not revocations.is_revoked("jti-2")
+    assert not revocations.is_revoked(None)
+
+
+def test_revoke_during_rebuild_survives_the_swap(db, user, monkeypatch):
+    revocations = RevocationList(refresh_interval=0, rebuild_interval=3600)
+    real_query = db.query
+
+    def query(*entities):
+        monkeypatch.setattr(db, "query", real_query)
+        return _AfterRead(real_query(*entities), lambda: revocations.revoke(db, [("late", _expires(), user.id)]))
+
+    monkeypatch.setattr(db, "query", query)
+    revocations.rebuild(db)
+    assert revocations.is_revoked("late")
+
+
+def test_bloom_filter_keeps_every_concurrent_add():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    keys = [f"key-{n}" for n in range(4000)]
+    threads = [threading.Thread(target=lambda part=part: [bloom.add(key) for key in part])
+               for part in (keys[n::8] for n in range(8))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(key in bloom for key in keys)
+    assert bloom.count == len(keys)